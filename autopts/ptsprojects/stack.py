@@ -12,22 +12,34 @@
 # FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
 # more details.
 #
-import binascii
 import logging
-import copy
 import threading
-from threading import Lock, Timer, Event
-from time import sleep
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from enum import IntFlag
+from operator import itemgetter
+from threading import Event
+from time import sleep, monotonic
 
 from autopts.pybtp import defs
-from autopts.pybtp.types import AdType, Addr, IOCap
-from autopts.utils import raise_on_global_end, ResultWithFlag
+from autopts.pybtp.types import AdType, Addr, IOCap, gap_settings_btp2txt
+from autopts.utils import raise_on_global_end
 
 STACK = None
 log = logging.debug
 
+# Longest time a waiter blocks before re-checking the global end flag
+WAIT_POLL_INTERVAL = 0.5
+# Interval at which waiters re-check state that is not signalled
+STATE_POLL_INTERVAL = 0.1
+# Oldest unconsumed events are dropped beyond this size
+EVENT_QUEUE_MAXLEN = 1024
+
 
 class GattAttribute:
+    __slots__ = ('handle', 'perm', 'uuid', 'att_read_rsp')
+
     def __init__(self, handle, perm, uuid, att_rsp):
         self.handle = handle
         self.perm = perm
@@ -36,20 +48,24 @@ class GattAttribute:
 
 
 class GattService(GattAttribute):
+    __slots__ = ('end_handle',)
+
     def __init__(self, handle, perm, uuid, att_rsp, end_handle=None):
         super().__init__(handle, perm, uuid, att_rsp)
         self.end_handle = end_handle
 
 
 class GattPrimary(GattService):
-    pass
+    __slots__ = ()
 
 
 class GattSecondary(GattService):
-    pass
+    __slots__ = ()
 
 
 class GattServiceIncluded(GattAttribute):
+    __slots__ = ('incl_svc_hdl', 'end_grp_hdl')
+
     def __init__(self, handle, perm, uuid, att_rsp, incl_svc_hdl, end_grp_hdl):
         GattAttribute.__init__(self, handle, perm, uuid, att_rsp)
         self.incl_svc_hdl = incl_svc_hdl
@@ -57,6 +73,8 @@ class GattServiceIncluded(GattAttribute):
 
 
 class GattCharacteristic(GattAttribute):
+    __slots__ = ('prop', 'value_handle')
+
     def __init__(self, handle, perm, uuid, att_rsp, prop, value_handle):
         GattAttribute.__init__(self, handle, perm, uuid, att_rsp)
         self.prop = prop
@@ -64,6 +82,8 @@ class GattCharacteristic(GattAttribute):
 
 
 class GattCharacteristicDescriptor(GattAttribute):
+    __slots__ = ('value', 'has_changed_cnt', 'has_changed')
+
     def __init__(self, handle, perm, uuid, att_rsp, value):
         GattAttribute.__init__(self, handle, perm, uuid, att_rsp)
         self.value = value
@@ -72,94 +92,190 @@ class GattCharacteristicDescriptor(GattAttribute):
 
 
 class GattDB:
+    __slots__ = ('db', 'handles')
+
     def __init__(self):
         self.db = dict()
+        # Sorted 16-bit handles of the attributes in db, for range lookups
+        self.handles = array('H')
 
     def attr_add(self, handle, attr):
+        if handle not in self.db:
+            # Handles usually come in ascending order, so this is an append
+            insort(self.handles, handle)
         self.db[handle] = attr
 
     def attr_lookup_handle(self, handle):
-        if handle in self.db:
-            return self.db[handle]
-        return None
+        return self.db.get(handle)
+
+    def attr_lookup_range(self, start, end):
+        """Return attributes with handles in range [start, end] in order"""
+        lo = bisect_left(self.handles, start)
+        hi = bisect_right(self.handles, end, lo)
+        return [self.db[handle] for handle in self.handles[lo:hi]]
 
 
 class Property:
+    __slots__ = ('data',)
+
     def __init__(self, data):
-        self._lock = Lock()
         self.data = data
 
-    def __get__(self, instance, owner):
-        with self._lock:
-            return getattr(instance, self.data)
-
-    def __set__(self, instance, value):
-        with self._lock:
-            setattr(instance, self.data, value)
-
 
 class WildCard:
     def __eq__(self, other):
         return True
 
 
-def wait_event_with_condition(event_queue, condition_cb, timeout, remove):
-    flag = Event()
-    flag.set()
+class EventQueue(deque):
+    """Queue of received events that wakes up its waiters on every append"""
 
-    t = Timer(timeout, timeout_cb, [flag])
-    t.start()
+    def __init__(self, maxlen=None, cond=None):
+        # Read the limit here so that it can be tuned before the stack
+        # is initialised
+        if maxlen is None:
+            maxlen = EVENT_QUEUE_MAXLEN
+        super().__init__(maxlen=maxlen)
+        self.cond = cond if cond is not None else threading.Condition()
 
-    while flag.is_set():
-        raise_on_global_end()
+    def append(self, ev):
+        with self.cond:
+            super().append(ev)
+            self.cond.notify_all()
 
-        for ev in event_queue:
-            if isinstance(ev, tuple):
-                result = condition_cb(*ev)
-            else:
-                result = condition_cb(ev)
+    def extend(self, evs):
+        with self.cond:
+            super().extend(evs)
+            self.cond.notify_all()
 
-            if result:
-                t.cancel()
-                if ev and remove:
-                    event_queue.remove(ev)
+    def clear(self):
+        # Do not mutate the queue while a waiter iterates over it
+        with self.cond:
+            super().clear()
+
+    def snapshot(self):
+        """Return a copy of the queued events that is safe to iterate"""
+        with self.cond:
+            return list(self)
 
-                return ev
 
-            # TODO: Use wait() and notify() from threading.Condition
-            #  instead of sleep()
-            sleep(0.5)
+def new_event_queues(*event_types):
+    """Create the event queues of a service, all sharing one condition"""
+    cond = threading.Condition()
+    return {event_type: EventQueue(cond=cond) for event_type in event_types}
 
+
+def _find_event_prefix(event_queue, key):
+    n = len(key)
+    for i, ev in enumerate(event_queue):
+        if ev[:n] == key:
+            return i
     return None
 
 
-def wait_for_event_iut(event_queue, timeout, remove):
-    flag = Event()
-    flag.set()
+def _find_event_set(event_queue, _):
+    for i, ev in enumerate(event_queue):
+        if ev:
+            return i
+    return None
 
-    t = Timer(timeout, timeout_cb, [flag])
-    t.start()
 
-    while flag.is_set():
-        raise_on_global_end()
+def _find_event_first(event_queue, _):
+    return 0 if event_queue else None
+
 
-        for ev in event_queue:
-            if ev:
-                t.cancel()
+def _find_event_key(event_queue, key_fn_and_key):
+    key_fn, key = key_fn_and_key
+    for i, ev in enumerate(event_queue):
+        if key_fn(ev) == key:
+            return i
+    return None
+
+
+def _wait_event(event_queue, find_event, arg, timeout, remove):
+    """Wait for an event, find_event(event_queue, arg) returns its index"""
+    deadline = monotonic() + timeout
+
+    with event_queue.cond:
+        while True:
+            raise_on_global_end()
+
+            i = find_event(event_queue, arg)
+            if i is not None:
+                ev = event_queue[i]
                 if ev and remove:
-                    event_queue.remove(ev)
+                    if i == 0:
+                        event_queue.popleft()
+                    else:
+                        del event_queue[i]
+
                 return ev
 
-            sleep(0.5)
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return None
 
-    return None
+            # Wake up periodically to check for the global end
+            event_queue.cond.wait(min(remaining, WAIT_POLL_INTERVAL))
+
+
+def wait_event_matching_fields(event_queue, key, timeout, remove):
+    """Wait for an event tuple whose leading fields are equal to key"""
+    return _wait_event(event_queue, _find_event_prefix, key, timeout, remove)
+
+
+def wait_event_matching_key(event_queue, key_fn, key, timeout, remove):
+    """Wait for an event for which key_fn(event) is equal to key"""
+    return _wait_event(event_queue, _find_event_key, (key_fn, key),
+                       timeout, remove)
+
+
+def wait_addr_event(event_queue, addr_type, addr, timeout, remove):
+    """Wait for an event tuple starting with (addr_type, addr)"""
+    return wait_event_matching_fields(event_queue, (addr_type, addr),
+                                      timeout, remove)
+
+
+def wait_for_event_iut(event_queue, timeout, remove):
+    return _wait_event(event_queue, _find_event_set, None, timeout, remove)
+
+
+def wait_for_first_event(event_queue, timeout, remove):
+    """Wait for any event to be queued and return the oldest one"""
+    return _wait_event(event_queue, _find_event_first, None, timeout, remove)
+
+
+def _wait_until(predicate, timeout, event=None):
+    """Wait until predicate() returns true or timeout expires
+
+    If event is given, block on it between the checks. Producers set it
+    whenever the state watched by the predicate may have changed.
+
+    Returns True if the predicate has been fulfilled, False on timeout.
+    """
+    deadline = monotonic() + timeout
+
+    while True:
+        raise_on_global_end()
+
+        if predicate():
+            return True
 
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False
 
-def timeout_cb(flag):
-    flag.clear()
+        if event is None:
+            sleep(min(remaining, STATE_POLL_INTERVAL))
+        else:
+            event.wait(min(remaining, WAIT_POLL_INTERVAL))
+            event.clear()
 
 
 class ConnParams:
+    __slots__ = ('conn_itvl_min', 'conn_itvl_max', 'conn_latency',
+                 'supervision_timeout')
+
     def __init__(self, conn_itvl_min, conn_itvl_max, conn_latency, supervision_timeout):
         self.conn_itvl_min = conn_itvl_min
         self.conn_itvl_max = conn_itvl_max
@@ -167,6 +283,22 @@ class ConnParams:
         self.supervision_timeout = supervision_timeout
 
 
+# Gap current settings name to its bit in Gap.current_settings
+SETTINGS_BIT = {name: bit for bit, name in gap_settings_btp2txt.items()}
+
+# UTF-8 encoded device names, Gap is recreated with the same name on
+# every stack cleanup
+_NAME_CACHE = {}
+
+
+def _encode_name(name):
+    encoded = _NAME_CACHE.get(name)
+    if encoded is None:
+        encoded = _NAME_CACHE[name] = name.encode('utf-8')
+
+    return encoded
+
+
 class Gap:
     def __init__(self, name, manufacturer_data, appearance, svc_data, flags,
                  svcs, uri=None, periodic_data=None, le_supp_feat=None):
@@ -178,7 +310,7 @@ class Gap:
             if isinstance(name, bytes):
                 self.ad[AdType.name_full] = name
             else:
-                self.ad[AdType.name_full] = name.encode('utf-8')
+                self.ad[AdType.name_full] = _encode_name(name)
 
         if manufacturer_data:
             self.sd[AdType.manufacturer_data] = manufacturer_data
@@ -197,30 +329,14 @@ class Gap:
         # If disconnected - None
         # If connected - remote address tuple (addr, addr_type)
         self.connected = Property(None)
-        self.current_settings = Property({
-            "Powered": False,
-            "Connectable": False,
-            "Fast Connectable": False,
-            "Discoverable": False,
-            "Bondable": False,
-            "Link Level Security": False,  # Link Level Security (Sec. mode 3)
-            "SSP": False,  # Secure Simple Pairing
-            "BREDR": False,  # Basic Rate/Enhanced Data Rate
-            "HS": False,  # High Speed
-            "LE": False,  # Low Energy
-            "Advertising": False,
-            "SC": False,  # Secure Connections
-            "Debug Keys": False,
-            "Privacy": False,
-            "Controller Configuration": False,
-            "Static Address": False,
-            "Extended Advertising": False,
-            "SC Only": False,
-        })
+        # Bitfield of GAP settings, see SETTINGS_BIT for the names
+        self.current_settings = 0
         self.iut_bd_addr = Property({
             "address": None,
             "type": None,
         })
+        # Decoded form of iut_bd_addr address, updated by iut_addr_set()
+        self._iut_addr_str = "000000000000"
         self.discoverying = Property(False)
         self.found_devices = Property([])  # List of found devices
 
@@ -238,44 +354,14 @@ class Gap:
         self.periodic_report_rxed = False
         self.periodic_sync_established_rxed = False
         self.periodic_transfer_received = False
+        # Set by event handlers on every change of the state above
+        self.state_changed = Event()
 
     def wait_for_connection(self, timeout, conn_count=0):
-        if self.is_connected(conn_count):
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.is_connected(conn_count):
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: self.is_connected(conn_count), timeout, self.state_changed)
 
     def wait_for_disconnection(self, timeout):
-        if not self.is_connected(0):
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if not self.is_connected(0):
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: not self.is_connected(0), timeout, self.state_changed)
 
     def is_connected(self, conn_count):
         if conn_count > 0:
@@ -289,19 +375,9 @@ class Gap:
         if self.periodic_report_rxed:
             return True
 
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.periodic_report_rxed:
-                t.cancel()
-                self.periodic_report_rxed = False
-                return True
+        if _wait_until(lambda: self.periodic_report_rxed, timeout, self.state_changed):
+            self.periodic_report_rxed = False
+            return True
 
         return False
 
@@ -309,19 +385,9 @@ class Gap:
         if self.periodic_sync_established_rxed:
             return True
 
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.periodic_sync_established_rxed:
-                t.cancel()
-                self.periodic_sync_established_rxed = False
-                return True
+        if _wait_until(lambda: self.periodic_sync_established_rxed, timeout, self.state_changed):
+            self.periodic_sync_established_rxed = False
+            return True
 
         return False
 
@@ -329,52 +395,29 @@ class Gap:
         if self.periodic_transfer_received:
             return True
 
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.periodic_transfer_received:
-                t.cancel()
-                self.periodic_transfer_received = False
-                return True
+        if _wait_until(lambda: self.periodic_transfer_received, timeout, self.state_changed):
+            self.periodic_transfer_received = False
+            return True
 
         return False
 
+    # Unknown keys raise KeyError from the SETTINGS_BIT lookup
     def current_settings_set(self, key):
-        if key in self.current_settings.data:
-            self.current_settings.data[key] = True
-        else:
-            logging.error("%s %s not in current_settings",
-                          self.current_settings_set.__name__, key)
+        self.current_settings |= 1 << SETTINGS_BIT[key]
 
     def current_settings_clear(self, key):
-        if key in self.current_settings.data:
-            self.current_settings.data[key] = False
-        else:
-            logging.error("%s %s not in current_settings",
-                          self.current_settings_clear.__name__, key)
+        self.current_settings &= ~(1 << SETTINGS_BIT[key])
 
     def current_settings_get(self, key):
-        if key in self.current_settings.data:
-            return self.current_settings.data[key]
-        logging.error("%s %s not in current_settings",
-                      self.current_settings_get.__name__, key)
-        return False
+        return bool(self.current_settings >> SETTINGS_BIT[key] & 1)
 
     def iut_addr_get_str(self):
-        addr = self.iut_bd_addr.data["address"]
-        if addr:
-            return addr.decode("utf-8")
-        return "000000000000"
+        return self._iut_addr_str
 
     def iut_addr_set(self, addr, addr_type):
         self.iut_bd_addr.data["address"] = addr
         self.iut_bd_addr.data["type"] = addr_type
+        self._iut_addr_str = addr.decode("utf-8") if addr else "000000000000"
 
     def iut_addr_is_random(self):
         return self.iut_bd_addr.data["type"] == Addr.le_random
@@ -391,72 +434,29 @@ class Gap:
 
     def set_passkey(self, passkey):
         self.passkey.data = passkey
+        self.state_changed.set()
 
     def get_passkey(self, timeout=5):
         if self.passkey.data is None:
-            flag = Event()
-            flag.set()
-
-            t = Timer(timeout, timeout_cb, [flag])
-            t.start()
-
-            while flag.is_set():
-                raise_on_global_end()
-
-                if self.passkey.data:
-                    t.cancel()
-                    break
+            _wait_until(lambda: self.passkey.data, timeout, self.state_changed)
 
         return self.passkey.data
 
     def gap_wait_for_pairing_fail(self, timeout=5):
         if self.pairing_failed_rcvd.data is None:
-            flag = Event()
-            flag.set()
-
-            t = Timer(timeout, timeout_cb, [flag])
-            t.start()
-
-            while flag.is_set():
-                raise_on_global_end()
-
-                if self.pairing_failed_rcvd.data:
-                    t.cancel()
-                    break
+            _wait_until(lambda: self.pairing_failed_rcvd.data, timeout, self.state_changed)
 
         return self.pairing_failed_rcvd.data
 
     def gap_wait_for_lost_bond(self, timeout=5):
         if self.bond_lost_ev_data.data is None:
-            flag = Event()
-            flag.set()
-
-            t = Timer(timeout, timeout_cb, [flag])
-            t.start()
-
-            while flag.is_set():
-                raise_on_global_end()
-
-                if self.bond_lost_ev_data.data:
-                    t.cancel()
-                    break
+            _wait_until(lambda: self.bond_lost_ev_data.data, timeout, self.state_changed)
 
         return self.bond_lost_ev_data.data
 
     def gap_wait_for_sec_lvl_change(self, level, timeout=5):
         if self.sec_level != level:
-            flag = Event()
-            flag.set()
-
-            t = Timer(timeout, timeout_cb, [flag])
-            t.start()
-
-            while flag.is_set():
-                raise_on_global_end()
-
-                if self.sec_level == level:
-                    t.cancel()
-                    break
+            _wait_until(lambda: self.sec_level == level, timeout, self.state_changed)
 
         return self.sec_level
 
@@ -464,6 +464,10 @@ class Gap:
         self.pair_user_interaction = user_interaction
 
 
+# Placeholder stored once a received model message has been consumed
+_NO_MODEL_RECV_EV = (0, 0, b'')
+
+
 class Mesh:
     def __init__(self, uuid, uuid_lt2=None):
 
@@ -485,6 +489,8 @@ class Mesh:
         self.last_seen_prov_link_state = Property(None)
         self.prov_invalid_bearer_rcv = Property(False)
         self.blob_lost_target = False
+        # Set by event handlers on every change of the state above
+        self.state_changed = Event()
 
         # network data
         self.lt1_addr = 0x0001
@@ -603,47 +609,22 @@ class Mesh:
 
     def node_added(self, net_idx, addr, uuid, num_elems):
         self.nodes_added.data[uuid] = (net_idx, addr, uuid, num_elems)
+        self.state_changed.set()
 
     def expect_node(self, uuid):
         self.nodes_expected.data.append(uuid)
 
     def wait_for_node_added_uuid(self, timeout, uuid):
-        if uuid in self.nodes_added.data:
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if uuid in self.nodes_added.data:
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: uuid in self.nodes_added.data, timeout, self.state_changed)
 
     def wait_for_model_added_op(self, timeout, op):
-        if self.model_recv_ev_data.data is not None and \
-               self.model_recv_ev_data.data[2][0:4] == op:
-            self.model_recv_ev_data.data = (0, 0, b'')
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
+        def is_op_received():
+            data = self.model_recv_ev_data.data
+            return data is not None and data[2].startswith(op)
 
-        while flag.is_set():
-            if self.model_recv_ev_data.data is not None and \
-                    self.model_recv_ev_data.data[2][0:4] == op:
-                t.cancel()
-                self.model_recv_ev_data.data = (0, 0, b'')
-                return True
+        if _wait_until(is_op_received, timeout, self.state_changed):
+            self.model_recv_ev_data.data = _NO_MODEL_RECV_EV
+            return True
 
         return False
 
@@ -669,137 +650,48 @@ class Mesh:
         self.tester_comp_data.data[page] = comp
 
     def get_tester_comp_data(self, page):
-        if page in self.tester_comp_data.data:
-            return self.tester_comp_data.data[page]
+        return self.tester_comp_data.data.get(page)
 
     def recv_status_data_set(self, key, data):
-        if key in self.recv_status_data.data:
-            self.recv_status_data.data[key] = data
-        else:
-            logging.error("%s %s not in store data",
-                          self.recv_status_data_set.__name__, key)
+        if key not in self.recv_status_data.data:
+            raise KeyError(f"{key} not in store data")
+
+        self.recv_status_data.data[key] = data
 
     def recv_status_data_get(self, key):
-        if key in self.recv_status_data.data:
-            return self.recv_status_data.data[key]
-        logging.error("%s %s not in store data",
-                      self.recv_status_data_get.__name__, key)
-        return False
+        return self.recv_status_data.data[key]
 
     def expect_status_data_set(self, key, data):
-        if key in self.expect_status_data.data:
-            self.expect_status_data.data[key] = data
-        else:
-            logging.error("%s %s not in store data",
-                          self.expect_status_data_set.__name__, key)
+        if key not in self.expect_status_data.data:
+            raise KeyError(f"{key} not in store data")
+
+        self.expect_status_data.data[key] = data
 
     def expect_status_data_get(self, key):
-        if key in self.expect_status_data.data:
-            return self.expect_status_data.data[key]
-        logging.error("%s %s not in store data",
-                      self.expect_status_data_get.__name__, key)
-        return False
+        return self.expect_status_data.data[key]
 
     def proxy_identity_enable(self):
         self.proxy_identity = True
 
     def wait_for_incomp_timer_exp(self, timeout):
-        if self.incomp_timer_exp.data:
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.incomp_timer_exp.data:
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: self.incomp_timer_exp.data, timeout, self.state_changed)
 
     def wait_for_prov_link_close(self, timeout):
         if not self.last_seen_prov_link_state.data:
             self.last_seen_prov_link_state.data = ('uninitialized', None)
 
-        state, _ = self.last_seen_prov_link_state.data
-        if state == 'closed':
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            state, _ = self.last_seen_prov_link_state.data
-            if state == 'closed':
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(
+            lambda: self.last_seen_prov_link_state.data[0] == 'closed',
+            timeout, self.state_changed)
 
     def wait_for_lpn_established(self, timeout):
-        if self.lpn.data:
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.lpn.data:
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: self.lpn.data, timeout, self.state_changed)
 
     def wait_for_lpn_terminated(self, timeout):
-        if not self.lpn.data:
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if not self.lpn.data:
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: not self.lpn.data, timeout, self.state_changed)
 
     def wait_for_blob_target_lost(self, timeout):
-        if self.blob_lost_target:
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            if self.blob_lost_target:
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: self.blob_lost_target, timeout, self.state_changed)
 
     def pub_key_set(self, pub_key):
         self.pub_key.data = pub_key
@@ -814,417 +706,222 @@ class Mesh:
         return self.priv_key.data
 
 
-class VCP:
-    def __init__(self):
-        self.wid_counter = 0
-        self.event_queues = {
-            defs.VCP_DISCOVERED_EV: [],
-            defs.VCP_STATE_EV: [],
-            defs.VCP_FLAGS_EV: [],
-            defs.VCP_PROCEDURE_EV: [],
-        }
+class EventSource:
+    """Queues received events in self.event_queues by event type"""
+
+    __slots__ = ()
 
     def event_received(self, event_type, event_data_tuple):
         self.event_queues[event_type].append(event_data_tuple)
 
-    def wait_discovery_completed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VCP_DISCOVERED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    def clear_events(self):
+        for queue in self.event_queues.values():
+            queue.clear()
 
-    def wait_vcp_state_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VCP_STATE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
 
-    def wait_vcp_flags_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VCP_FLAGS_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+class AddrKeyedEventMixin(EventSource):
+    """Waits for queued events that start with (addr_type, addr)"""
 
-    def wait_vcp_procedure_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VCP_PROCEDURE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    __slots__ = ()
 
+    def wait_ev(self, event_type, addr_type, addr, timeout, remove=True):
+        return wait_addr_event(self.event_queues[event_type],
+                               addr_type, addr, timeout, remove)
 
-class VCS:
-    pass
 
+def addr_event_waiter(event_type):
+    """Build a wait_*_ev method of an AddrKeyedEventMixin for event_type"""
+    def waiter(self, addr_type, addr, timeout, remove=True):
+        return self.wait_ev(event_type, addr_type, addr, timeout, remove)
+
+    return waiter
 
-class VOCS:
+
+class VCP(AddrKeyedEventMixin):
     def __init__(self):
-        self.event_queues = {
-            defs.VOCS_OFFSET_EV: [],
-            defs.VOCS_AUDIO_LOC_EV: [],
-            defs.VOCS_PROCEDURE_EV: []
-        }
+        self.wid_counter = 0
+        self.event_queues = new_event_queues(
+            defs.VCP_DISCOVERED_EV,
+            defs.VCP_STATE_EV,
+            defs.VCP_FLAGS_EV,
+            defs.VCP_PROCEDURE_EV)
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
+    def cleanup(self):
+        self.wid_counter = 0
+        self.clear_events()
 
-    def wait_vocs_state_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VOCS_OFFSET_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_discovery_completed_ev = addr_event_waiter(defs.VCP_DISCOVERED_EV)
+    wait_vcp_state_ev = addr_event_waiter(defs.VCP_STATE_EV)
+    wait_vcp_flags_ev = addr_event_waiter(defs.VCP_FLAGS_EV)
+    wait_vcp_procedure_ev = addr_event_waiter(defs.VCP_PROCEDURE_EV)
 
-    def wait_vocs_location_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VOCS_AUDIO_LOC_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
 
-    def wait_vocs_procedure_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.VOCS_PROCEDURE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+class VCS:
+    pass
 
 
-class AICS:
+class VOCS(AddrKeyedEventMixin):
     def __init__(self):
-        self.event_queues = {
-            defs.AICS_STATE_EV: [],
-            defs.AICS_GAIN_SETTING_PROP_EV: [],
-            defs.AICS_INPUT_TYPE_EV: [],
-            defs.AICS_STATUS_EV: [],
-            defs.AICS_DESCRIPTION_EV: [],
-            defs.AICS_PROCEDURE_EV: [],
-        }
-
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
+        self.event_queues = new_event_queues(
+            defs.VOCS_OFFSET_EV,
+            defs.VOCS_AUDIO_LOC_EV,
+            defs.VOCS_PROCEDURE_EV)
 
-    def wait_aics_state_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.AICS_STATE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    def cleanup(self):
+        self.clear_events()
 
-    def wait_aics_gain_setting_prop_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.AICS_GAIN_SETTING_PROP_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_vocs_state_ev = addr_event_waiter(defs.VOCS_OFFSET_EV)
+    wait_vocs_location_ev = addr_event_waiter(defs.VOCS_AUDIO_LOC_EV)
+    wait_vocs_procedure_ev = addr_event_waiter(defs.VOCS_PROCEDURE_EV)
 
-    def wait_aics_input_type_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.AICS_INPUT_TYPE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
 
-    def wait_aics_status_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.AICS_STATUS_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+class AICS(AddrKeyedEventMixin):
+    def __init__(self):
+        self.event_queues = new_event_queues(
+            defs.AICS_STATE_EV,
+            defs.AICS_GAIN_SETTING_PROP_EV,
+            defs.AICS_INPUT_TYPE_EV,
+            defs.AICS_STATUS_EV,
+            defs.AICS_DESCRIPTION_EV,
+            defs.AICS_PROCEDURE_EV)
 
-    def wait_aics_description_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.AICS_DESCRIPTION_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    def cleanup(self):
+        self.clear_events()
 
-    def wait_aics_procedure_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.AICS_PROCEDURE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_aics_state_ev = addr_event_waiter(defs.AICS_STATE_EV)
+    wait_aics_gain_setting_prop_ev = addr_event_waiter(defs.AICS_GAIN_SETTING_PROP_EV)
+    wait_aics_input_type_ev = addr_event_waiter(defs.AICS_INPUT_TYPE_EV)
+    wait_aics_status_ev = addr_event_waiter(defs.AICS_STATUS_EV)
+    wait_aics_description_ev = addr_event_waiter(defs.AICS_DESCRIPTION_EV)
+    wait_aics_procedure_ev = addr_event_waiter(defs.AICS_PROCEDURE_EV)
 
 
-class PACS:
+class PACS(AddrKeyedEventMixin):
     def __init__(self):
-        self.event_queues = {
-            defs.PACS_EV_CHARACTERISTIC_SUBSCRIBED: [],
-        }
+        self.event_queues = new_event_queues(
+            defs.PACS_EV_CHARACTERISTIC_SUBSCRIBED)
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
-
-    def wait_pacs_characteristic_subscribed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.PACS_EV_CHARACTERISTIC_SUBSCRIBED],
-            lambda _addr_type, _addr, *_: (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_pacs_characteristic_subscribed_ev = addr_event_waiter(defs.PACS_EV_CHARACTERISTIC_SUBSCRIBED)
 
 
-class MICP:
+class MICP(AddrKeyedEventMixin):
     def __init__(self):
-        self.event_queues = {
-            defs.MICP_DISCOVERED_EV: [],
-            defs.MICP_MUTE_STATE_EV: [],
-        }
-
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
-
-    def wait_discovery_completed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MICP_DISCOVERED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+        self.event_queues = new_event_queues(
+            defs.MICP_DISCOVERED_EV,
+            defs.MICP_MUTE_STATE_EV)
 
-    def wait_mute_state_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MICP_MUTE_STATE_EV],
-            lambda _addr_type, _addr, *_:
-                (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_discovery_completed_ev = addr_event_waiter(defs.MICP_DISCOVERED_EV)
+    wait_mute_state_ev = addr_event_waiter(defs.MICP_MUTE_STATE_EV)
 
 
-class MICS:
+class MICS(EventSource):
     def __init__(self):
         self.mute_state = None
-        self.event_queues = {
-            defs.MICS_MUTE_STATE_EV: [],
-        }
+        self.event_queues = new_event_queues(
+            defs.MICS_MUTE_STATE_EV)
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
+    def cleanup(self):
+        self.mute_state = None
+        self.clear_events()
 
     def wait_mute_state_ev(self, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MICS_MUTE_STATE_EV],
-            lambda *_: True, timeout, remove)
+        return wait_for_first_event(
+            self.event_queues[defs.MICS_MUTE_STATE_EV], timeout, remove)
+
 
+class MCP(AddrKeyedEventMixin):
+    __slots__ = ('event_queues', 'error_opcodes')
 
-class MCP:
     def __init__(self):
-        self.event_queues = {
-            defs.MCP_DISCOVERED_EV: [],
-            defs.MCP_TRACK_DURATION_EV: [],
-            defs.MCP_TRACK_POSITION_EV: [],
-            defs.MCP_PLAYBACK_SPEED_EV: [],
-            defs.MCP_SEEKING_SPEED_EV: [],
-            defs.MCP_ICON_OBJ_ID_EV: [],
-            defs.MCP_NEXT_TRACK_OBJ_ID_EV: [],
-            defs.MCP_PARENT_GROUP_OBJ_ID_EV: [],
-            defs.MCP_CURRENT_GROUP_OBJ_ID_EV: [],
-            defs.MCP_PLAYING_ORDER_EV: [],
-            defs.MCP_PLAYING_ORDERS_SUPPORTED_EV: [],
-            defs.MCP_MEDIA_STATE_EV: [],
-            defs.MCP_OPCODES_SUPPORTED_EV: [],
-            defs.MCP_CONTENT_CONTROL_ID_EV: [],
-            defs.MCP_SEGMENTS_OBJ_ID_EV: [],
-            defs.MCP_CURRENT_TRACK_OBJ_ID_EV: [],
-            defs.MCP_COMMAND_EV: [],
-            defs.MCP_SEARCH_EV: [],
-            defs.MCP_CMD_NTF_EV: [],
-            defs.MCP_SEARCH_NTF_EV: []
-        }
+        self.event_queues = new_event_queues(
+            defs.MCP_DISCOVERED_EV,
+            defs.MCP_TRACK_DURATION_EV,
+            defs.MCP_TRACK_POSITION_EV,
+            defs.MCP_PLAYBACK_SPEED_EV,
+            defs.MCP_SEEKING_SPEED_EV,
+            defs.MCP_ICON_OBJ_ID_EV,
+            defs.MCP_NEXT_TRACK_OBJ_ID_EV,
+            defs.MCP_PARENT_GROUP_OBJ_ID_EV,
+            defs.MCP_CURRENT_GROUP_OBJ_ID_EV,
+            defs.MCP_PLAYING_ORDER_EV,
+            defs.MCP_PLAYING_ORDERS_SUPPORTED_EV,
+            defs.MCP_MEDIA_STATE_EV,
+            defs.MCP_OPCODES_SUPPORTED_EV,
+            defs.MCP_CONTENT_CONTROL_ID_EV,
+            defs.MCP_SEGMENTS_OBJ_ID_EV,
+            defs.MCP_CURRENT_TRACK_OBJ_ID_EV,
+            defs.MCP_COMMAND_EV,
+            defs.MCP_SEARCH_EV,
+            defs.MCP_CMD_NTF_EV,
+            defs.MCP_SEARCH_NTF_EV)
         self.error_opcodes = []
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
-
-    def wait_discovery_completed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_DISCOVERED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_track_duration_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_TRACK_DURATION_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_track_position_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_TRACK_POSITION_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_playback_speed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_PLAYBACK_SPEED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_seeking_speed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_SEEKING_SPEED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_icon_obj_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_ICON_OBJ_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_next_track_obj_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_NEXT_TRACK_OBJ_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_parent_group_obj_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_PARENT_GROUP_OBJ_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_current_group_obj_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_CURRENT_GROUP_OBJ_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_playing_order_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_PLAYING_ORDER_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_playing_orders_supported_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_PLAYING_ORDERS_SUPPORTED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_media_state_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_MEDIA_STATE_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_opcodes_supported_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_OPCODES_SUPPORTED_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_content_control_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_CONTENT_CONTROL_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_segments_obj_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_SEGMENTS_OBJ_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_current_track_obj_id_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_CURRENT_TRACK_OBJ_ID_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_control_point_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_COMMAND_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_search_control_point_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_SEARCH_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_cmd_notification_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_CMD_NTF_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
-    def wait_search_notification_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.MCP_SEARCH_NTF_EV],
-            lambda _addr_type, _addr, *_:
-            (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
-
+    def cleanup(self):
+        self.clear_events()
+        self.error_opcodes.clear()
+
+    wait_discovery_completed_ev = addr_event_waiter(defs.MCP_DISCOVERED_EV)
+    wait_track_duration_ev = addr_event_waiter(defs.MCP_TRACK_DURATION_EV)
+    wait_track_position_ev = addr_event_waiter(defs.MCP_TRACK_POSITION_EV)
+    wait_playback_speed_ev = addr_event_waiter(defs.MCP_PLAYBACK_SPEED_EV)
+    wait_seeking_speed_ev = addr_event_waiter(defs.MCP_SEEKING_SPEED_EV)
+    wait_icon_obj_id_ev = addr_event_waiter(defs.MCP_ICON_OBJ_ID_EV)
+    wait_next_track_obj_id_ev = addr_event_waiter(defs.MCP_NEXT_TRACK_OBJ_ID_EV)
+    wait_parent_group_obj_id_ev = addr_event_waiter(defs.MCP_PARENT_GROUP_OBJ_ID_EV)
+    wait_current_group_obj_id_ev = addr_event_waiter(defs.MCP_CURRENT_GROUP_OBJ_ID_EV)
+    wait_playing_order_ev = addr_event_waiter(defs.MCP_PLAYING_ORDER_EV)
+    wait_playing_orders_supported_ev = addr_event_waiter(defs.MCP_PLAYING_ORDERS_SUPPORTED_EV)
+    wait_media_state_ev = addr_event_waiter(defs.MCP_MEDIA_STATE_EV)
+    wait_opcodes_supported_ev = addr_event_waiter(defs.MCP_OPCODES_SUPPORTED_EV)
+    wait_content_control_id_ev = addr_event_waiter(defs.MCP_CONTENT_CONTROL_ID_EV)
+    wait_segments_obj_id_ev = addr_event_waiter(defs.MCP_SEGMENTS_OBJ_ID_EV)
+    wait_current_track_obj_id_ev = addr_event_waiter(defs.MCP_CURRENT_TRACK_OBJ_ID_EV)
+    wait_control_point_ev = addr_event_waiter(defs.MCP_COMMAND_EV)
+    wait_search_control_point_ev = addr_event_waiter(defs.MCP_SEARCH_EV)
+    wait_cmd_notification_ev = addr_event_waiter(defs.MCP_CMD_NTF_EV)
+    wait_search_notification_ev = addr_event_waiter(defs.MCP_SEARCH_NTF_EV)
+
+
+class GMCS(EventSource):
+    __slots__ = ('track_obj_id', 'event_queues')
 
-class GMCS:
     def __init__(self):
         self.track_obj_id = None
         self.event_queues = {}
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
+    def cleanup(self):
+        self.track_obj_id = None
+        self.clear_events()
 
 
-class ASCS:
-    def __init__(self):
-        self.event_queues = {
-            defs.ASCS_EV_OPERATION_COMPLETED: [],
-            defs.ASCS_EV_CHARACTERISTIC_SUBSCRIBED: [],
-            defs.ASCS_EV_ASE_STATE_CHANGED: [],
-        }
+class ASCS(AddrKeyedEventMixin):
+    __slots__ = ('event_queues',)
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
+    def __init__(self):
+        self.event_queues = new_event_queues(
+            defs.ASCS_EV_OPERATION_COMPLETED,
+            defs.ASCS_EV_CHARACTERISTIC_SUBSCRIBED,
+            defs.ASCS_EV_ASE_STATE_CHANGED)
 
     def wait_ascs_operation_complete_ev(self, addr_type, addr, ase_id, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_fields(
             self.event_queues[defs.ASCS_EV_OPERATION_COMPLETED],
-            lambda _addr_type, _addr, _ase_id, *_: (addr_type, addr, ase_id) == (_addr_type, _addr, _ase_id),
-            timeout, remove)
+            (addr_type, addr, ase_id), timeout, remove)
 
-    def wait_ascs_characteristic_subscribed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.ASCS_EV_CHARACTERISTIC_SUBSCRIBED],
-            lambda _addr_type, _addr, *_: (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_ascs_characteristic_subscribed_ev = addr_event_waiter(defs.ASCS_EV_CHARACTERISTIC_SUBSCRIBED)
 
     def wait_ascs_ase_state_changed_ev(self, addr_type, addr, ase_id, state, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_fields(
             self.event_queues[defs.ASCS_EV_ASE_STATE_CHANGED],
-            lambda _addr_type, _addr, _ase_id, _state, *_:
-            (addr_type, addr, ase_id, state) == (_addr_type, _addr, _ase_id, _state),
-            timeout, remove)
+            (addr_type, addr, ase_id, state), timeout, remove)
 
 
-class CORE:
-    def __init__(self):
-        self.event_queues = {
-            defs.CORE_EV_IUT_READY: [],
-        }
+class CORE(EventSource):
+    __slots__ = ('event_queues',)
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
+    def __init__(self):
+        self.event_queues = new_event_queues(
+            defs.CORE_EV_IUT_READY)
 
     def wait_iut_ready_ev(self, timeout, remove=True):
         return wait_for_event_iut(
@@ -1240,109 +937,98 @@ class CORE:
             self.event_queues[key].clear()
 
 
-class BAP:
+# Keys of the dict events queued by BAP
+_BAP_ADDR_KEY = itemgetter('addr_type', 'addr')
+_BAP_BROADCAST_ID_KEY = itemgetter('broadcast_id')
+_BAP_BIS_KEY = itemgetter('broadcast_id', 'bis_id')
+_BAP_RECV_STATE_KEY = itemgetter('broadcast_id', 'addr_type', 'addr',
+                                 'broadcaster_addr_type', 'broadcaster_addr',
+                                 'pa_sync_state')
+
+
+class BAP(AddrKeyedEventMixin):
+    __slots__ = ('broadcast_id', 'broadcast_code', 'event_queues')
+
     def __init__(self):
         self.broadcast_id = 0x1000000  # Invalid Broadcast ID
         self.broadcast_code = ''
-        self.event_queues = {
-            defs.BAP_EV_DISCOVERY_COMPLETED: [],
-            defs.BAP_EV_CODEC_CAP_FOUND: [],
-            defs.BAP_EV_ASE_FOUND: [],
-            defs.BAP_EV_STREAM_RECEIVED: [],
-            defs.BAP_EV_BAA_FOUND: [],
-            defs.BAP_EV_BIS_FOUND: [],
-            defs.BAP_EV_BIS_SYNCED: [],
-            defs.BAP_EV_BIS_STREAM_RECEIVED: [],
-            defs.BAP_EV_SCAN_DELEGATOR_FOUND: [],
-            defs.BAP_EV_BROADCAST_RECEIVE_STATE: [],
-            defs.BAP_EV_PA_SYNC_REQ: [],
-        }
+        self.event_queues = new_event_queues(
+            defs.BAP_EV_DISCOVERY_COMPLETED,
+            defs.BAP_EV_CODEC_CAP_FOUND,
+            defs.BAP_EV_ASE_FOUND,
+            defs.BAP_EV_STREAM_RECEIVED,
+            defs.BAP_EV_BAA_FOUND,
+            defs.BAP_EV_BIS_FOUND,
+            defs.BAP_EV_BIS_SYNCED,
+            defs.BAP_EV_BIS_STREAM_RECEIVED,
+            defs.BAP_EV_SCAN_DELEGATOR_FOUND,
+            defs.BAP_EV_BROADCAST_RECEIVE_STATE,
+            defs.BAP_EV_PA_SYNC_REQ)
 
     def set_broadcast_code(self, broadcast_code):
         self.broadcast_code = broadcast_code
 
-    def event_received(self, event_type, event_data_tuple):
-        self.event_queues[event_type].append(event_data_tuple)
-
     def wait_codec_cap_found_ev(self, addr_type, addr, pac_dir, timeout, remove=False):
-        return wait_event_with_condition(
+        return wait_event_matching_fields(
             self.event_queues[defs.BAP_EV_CODEC_CAP_FOUND],
-            lambda _addr_type, _addr, _pac_dir, *_:
-                (addr_type, addr, pac_dir) == (_addr_type, _addr, _pac_dir),
-            timeout, remove)
+            (addr_type, addr, pac_dir), timeout, remove)
 
-    def wait_discovery_completed_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
-            self.event_queues[defs.BAP_EV_DISCOVERY_COMPLETED],
-            lambda _addr_type, _addr, *_:
-                (addr_type, addr) == (_addr_type, _addr),
-            timeout, remove)
+    wait_discovery_completed_ev = addr_event_waiter(defs.BAP_EV_DISCOVERY_COMPLETED)
 
     def wait_ase_found_ev(self, addr_type, addr, ase_dir, timeout, remove=False):
-        return wait_event_with_condition(
+        return wait_event_matching_fields(
             self.event_queues[defs.BAP_EV_ASE_FOUND],
-            lambda _addr_type, _addr, _ase_dir, *_:
-                (addr_type, addr, ase_dir) == (_addr_type, _addr, _ase_dir),
-            timeout, remove)
+            (addr_type, addr, ase_dir), timeout, remove)
 
     def wait_stream_received_ev(self, addr_type, addr, ase_id, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_fields(
             self.event_queues[defs.BAP_EV_STREAM_RECEIVED],
-            lambda _addr_type, _addr, _ase_id, *_:
-                (addr_type, addr, ase_id) == (_addr_type, _addr, _ase_id),
-            timeout, remove)
+            (addr_type, addr, ase_id), timeout, remove)
 
     def wait_baa_found_ev(self, addr_type, addr, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_BAA_FOUND],
-            lambda ev: (addr_type, addr) == (ev['addr_type'], ev['addr']),
-            timeout, remove)
+            _BAP_ADDR_KEY, (addr_type, addr), timeout, remove)
 
     def wait_bis_found_ev(self, broadcast_id, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_BIS_FOUND],
-            lambda ev: broadcast_id == ev['broadcast_id'],
-            timeout, remove)
+            _BAP_BROADCAST_ID_KEY, broadcast_id, timeout, remove)
 
     def wait_bis_synced_ev(self, broadcast_id, bis_id, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_BIS_SYNCED],
-            lambda ev: (broadcast_id, bis_id) == (ev['broadcast_id'], ev['bis_id']),
-            timeout, remove)
+            _BAP_BIS_KEY, (broadcast_id, bis_id), timeout, remove)
 
     def wait_bis_stream_received_ev(self, broadcast_id, bis_id, timeout, remove=True):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_BIS_STREAM_RECEIVED],
-            lambda ev: (broadcast_id, bis_id) == (ev['broadcast_id'], ev['bis_id']),
-            timeout, remove)
+            _BAP_BIS_KEY, (broadcast_id, bis_id), timeout, remove)
 
     def wait_scan_delegator_found_ev(self, addr_type, addr, timeout, remove=False):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_SCAN_DELEGATOR_FOUND],
-            lambda ev: (addr_type, addr) == (ev["addr_type"], ev["addr"]),
-            timeout, remove)
+            _BAP_ADDR_KEY, (addr_type, addr), timeout, remove)
 
     def wait_broadcast_receive_state_ev(self, broadcast_id, peer_addr_type, peer_addr,
                                         broadcaster_addr_type, broadcaster_addr,
                                         pa_sync_state, timeout, remove=False):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_BROADCAST_RECEIVE_STATE],
-            lambda ev: (broadcast_id, peer_addr_type, peer_addr,
-                        broadcaster_addr_type, broadcaster_addr,
-                        pa_sync_state) ==
-                       (ev["broadcast_id"], ev["addr_type"], ev["addr"],
-                        ev["broadcaster_addr_type"], ev["broadcaster_addr"],
-                        ev['pa_sync_state']),
+            _BAP_RECV_STATE_KEY,
+            (broadcast_id, peer_addr_type, peer_addr,
+             broadcaster_addr_type, broadcaster_addr, pa_sync_state),
             timeout, remove)
 
     def wait_pa_sync_req_ev(self, addr_type, addr, timeout, remove=False):
-        return wait_event_with_condition(
+        return wait_event_matching_key(
             self.event_queues[defs.BAP_EV_PA_SYNC_REQ],
-            lambda ev: (addr_type, addr) == (ev["addr_type"], ev["addr"]),
-            timeout, remove)
+            _BAP_ADDR_KEY, (addr_type, addr), timeout, remove)
 
 
 class CCP:
+    __slots__ = ('events',)
+
     def __init__(self):
         self.events = {
             defs.CCP_EV_DISCOVERED:  { 'count': 0, 'status': 0, 'tbs_count': 0, 'gtbs': False },
@@ -1350,12 +1036,17 @@ class CCP:
         }
 
     def event_received(self, event_type, event_dict):
+        # The BTP handlers build a fresh dict for every event, so a shallow
+        # copy is enough to keep the caller's dict untouched
         count = self.events[event_type]['count']
-        self.events[event_type] = copy.deepcopy(event_dict)
-        self.events[event_type]['count'] = count+1
+        self.events[event_type] = dict(event_dict, count=count + 1)
 
 
 class L2capChan:
+    __slots__ = ('id', 'psm', 'peer_mtu', 'peer_mps', 'our_mtu', 'our_mps',
+                 'peer_bd_addr_type', 'peer_bd_addr', 'disconn_reason',
+                 'data_tx', 'data_rx', 'state', 'state_changed')
+
     def __init__(self, chan_id, psm, peer_mtu, peer_mps, our_mtu, our_mps,
                  bd_addr_type, bd_addr):
         self.id = chan_id
@@ -1370,6 +1061,7 @@ class L2capChan:
         self.data_tx = []
         self.data_rx = []
         self.state = "init"  # "connected" / "disconnected"
+        self.state_changed = Event()
 
     def _get_state(self, timeout):
         if self.state and self.state != "init":
@@ -1377,18 +1069,8 @@ class L2capChan:
 
         #  In case of self initiated connection, wait a while
         #  for connected/disconnected event
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.state and self.state != "init":
-                t.cancel()
-                break
+        _wait_until(lambda: self.state and self.state != "init", timeout,
+                    self.state_changed)
 
         return self.state
 
@@ -1408,6 +1090,7 @@ class L2capChan:
         self.peer_bd_addr_type = bd_addr_type
         self.peer_bd_addr = bd_addr
         self.state = "connected"
+        self.state_changed.set()
 
     def disconnected(self, psm, bd_addr_type, bd_addr, reason):
         self.psm = None
@@ -1415,9 +1098,11 @@ class L2capChan:
         self.peer_bd_addr = None
         self.disconn_reason = reason
         self.state = "disconnected"
+        self.state_changed.set()
 
     def rx(self, data):
         self.data_rx.append(data)
+        self.state_changed.set()
 
     def tx(self, data):
         self.data_tx.append(data)
@@ -1426,18 +1111,9 @@ class L2capChan:
         if len(self.data_rx) != 0:
             return self.data_rx
 
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if len(self.data_rx) != 0:
-                t.cancel()
-                return self.data_rx
+        if _wait_until(lambda: len(self.data_rx) != 0, timeout,
+                       self.state_changed):
+            return self.data_rx
 
         return None
 
@@ -1458,22 +1134,23 @@ class L2cap:
     unacceptable_parameters = 0x000b
     invalid_parameters = 0x000c
 
+    __slots__ = ('psm', 'initial_mtu', 'channels', 'hold_credits',
+                 'num_channels', 'state_changed')
+
     def __init__(self, psm, initial_mtu):
         # PSM used for testing for Client role
         self.psm = psm
         self.initial_mtu = initial_mtu
-        self.channels = []
+        self.channels = {}  # Keyed by channel ID
         self.hold_credits = 0
         self.num_channels = 2
+        self.state_changed = Event()
 
     def chan_lookup_id(self, chan_id):
-        for chan in self.channels:
-            if chan.id == chan_id:
-                return chan
-        return None
+        return self.channels.get(chan_id)
 
     def clear_data(self):
-        for chan in self.channels:
+        for chan in list(self.channels.values()):
             chan.data_tx = []
             chan.data_rx = []
 
@@ -1502,10 +1179,11 @@ class L2cap:
         if chan is None:
             chan = L2capChan(chan_id, psm, peer_mtu, peer_mps, our_mtu, our_mps,
                              bd_addr_type, bd_addr)
-            self.channels.append(chan)
+            self.channels[chan_id] = chan
 
         chan.connected(psm, peer_mtu, peer_mps, our_mtu, our_mps,
                        bd_addr_type, bd_addr)
+        self.state_changed.set()
 
     def disconnected(self, chan_id, psm, bd_addr_type, bd_addr, reason):
         chan = self.chan_lookup_id(chan_id)
@@ -1513,9 +1191,10 @@ class L2cap:
             logging.error("unknown channel")
             return
         # Remove channel from saved channels
-        self.channels.remove(chan)
+        del self.channels[chan_id]
 
         chan.disconnected(psm, bd_addr_type, bd_addr, reason)
+        self.state_changed.set()
 
     def is_connected(self, chan_id):
         chan = self.chan_lookup_id(chan_id)
@@ -1528,39 +1207,15 @@ class L2cap:
         if not self.is_connected(chan_id):
             return True
 
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if not self.is_connected(chan_id):
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: not self.is_connected(chan_id), timeout,
+                           self.state_changed)
 
     def wait_for_connection(self, chan_id, timeout=5):
         if self.is_connected(chan_id):
             return True
 
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            raise_on_global_end()
-
-            if self.is_connected(chan_id):
-                t.cancel()
-                return True
-
-        return False
+        return _wait_until(lambda: self.is_connected(chan_id), timeout,
+                           self.state_changed)
 
     def rx(self, chan_id, data):
         chan = self.chan_lookup_id(chan_id)
@@ -1589,7 +1244,7 @@ class L2cap:
     def rx_data_get_all(self, timeout):
         data = []
 
-        for chan in self.channels:
+        for chan in list(self.channels.values()):
             data.append(chan.rx_data_get(timeout))
 
         return data
@@ -1605,47 +1260,37 @@ class L2cap:
     def tx_data_get_all(self):
         data = []
 
-        for chan in self.channels:
+        for chan in list(self.channels.values()):
             data.append(chan.tx_data_get())
 
         return data
 
 
 class SynchPoint:
+    __slots__ = ('test_case', 'wid', 'delay')
+
     def __init__(self, test_case, wid, delay=None):
         self.test_case = test_case
         self.wid = wid
         self.delay = delay
-        self.done = None
-
-    def set_done(self):
-        self.done.set(True)
-
-    def clear(self):
-        self.done.clear()
-
-    def wait(self):
-        self.done.wait()
 
 
 class SynchElem:
     def __init__(self, sync_points):
         self.sync_points = sync_points
         self.active_synch_point = None
+        # Sync points run in list order, _turn is the index of the one
+        # allowed to run now
+        self._turns = {point: i for i, point in enumerate(sync_points)}
+        self._turn = 0
+        self._turn_cond = threading.Condition()
         count = len(sync_points)
         self._start_barrier = threading.Barrier(count, self.clear_flags)
         self._end_barrier = threading.Barrier(count, self.clear_flags)
 
-    def find_matching(self, test_case, wid):
-        matching_items = [item for item in self.sync_points if
-                          item.test_case == test_case and item.wid == wid]
-        if matching_items:
-            return matching_items[0]
-        return None
-
     def clear_flags(self):
-        for point in self.sync_points:
-            point.clear()
+        with self._turn_cond:
+            self._turn = 0
 
     def wait_for_start(self):
         # While debugging, do not step over Barrier.wait() or other
@@ -1661,57 +1306,76 @@ class SynchElem:
             return False
         return True
 
+    def _is_cancelled(self):
+        return self._start_barrier.broken or self._end_barrier.broken
+
     def wait_for_your_turn(self, synch_point):
-        for point in self.sync_points:
-            if point == synch_point:
-                self.active_synch_point = synch_point
-                return True
+        turn = self._turns.get(synch_point)
+        if turn is None:
+            return False
 
-            point.wait()
+        with self._turn_cond:
+            while self._turn != turn:
+                if self._is_cancelled():
+                    return False
 
-            if self._start_barrier.broken or self._end_barrier.broken:
-                return False
+                raise_on_global_end()
+                self._turn_cond.wait(WAIT_POLL_INTERVAL)
 
-        return False
+        self.active_synch_point = synch_point
+        return True
+
+    def set_done(self, synch_point):
+        # Let the next sync point in the list run
+        with self._turn_cond:
+            self._turn = self._turns[synch_point] + 1
+            self._turn_cond.notify_all()
 
     def cancel_synch(self):
         self._end_barrier.abort()
         self._start_barrier.abort()
 
-        for point in self.sync_points:
-            point.set_done()
+        with self._turn_cond:
+            self._turn_cond.notify_all()
 
 
 class Synch:
     def __init__(self):
         self._synch_table = []
+        # (test case, wid) -> (SynchElem, SynchPoint), first element wins
+        self._synch_index = {}
         self._synch_condition = threading.Condition()
 
     def reinit(self):
         self._synch_table.clear()
+        self._synch_index = {}
 
-    def add_synch_element(self, elem):
-        for sync_point in elem:
-            # If a test case has to be repeated, its SyncPoints will be reused.
-            # Reinit done-flags to renew potentially broken locks.
-            sync_point.done = ResultWithFlag()
-
-        self._synch_table.append(SynchElem(elem))
+    def _index_element(self, index, synch_elem):
+        for point in synch_elem.sync_points:
+            index.setdefault((point.test_case, point.wid),
+                             (synch_elem, point))
 
-    def wait_for_start(self, wid, tc_name):
-        synch_point = None
-        elem = None
+    def _rebuild_index(self):
+        index = {}
+        for synch_elem in self._synch_table:
+            self._index_element(index, synch_elem)
+        self._synch_index = index
 
-        for i, elem in enumerate(self._synch_table):
-            synch_point = elem.find_matching(tc_name, wid)
-            if synch_point:
-                # Found a sync point matching the test case and wid
-                break
+    def add_synch_element(self, elem):
+        # If a test case has to be repeated, its SyncPoints will be reused.
+        # A new SynchElem gives them fresh barriers and turn state.
+        synch_elem = SynchElem(elem)
+        self._synch_table.append(synch_elem)
+        self._index_element(self._synch_index, synch_elem)
 
-        if not synch_point:
+    def wait_for_start(self, wid, tc_name):
+        match = self._synch_index.get((tc_name, wid))
+        if match is None:
             # No synch point found
             return None
 
+        elem, synch_point = match
+
         log(f'SYNCH: Waiting at barrier for start, tc {tc_name} wid {wid}')
         if not elem.wait_for_start():
             log(f'SYNCH: Cancelled waiting at barrier for start, tc {tc_name} wid {wid}')
@@ -1734,7 +1398,7 @@ class Synch:
             sleep(synch_point.delay)
 
         # Let other LT-threads know that this one completed the wid
-        synch_point.set_done()
+        synch_elem.set_done(synch_point)
         tc_name = synch_point.test_case
         wid = synch_point.wid
 
@@ -1751,6 +1415,8 @@ class Synch:
         except:
             # Already cleaned up by other thread
             pass
+        else:
+            self._rebuild_index()
 
         return None
 
@@ -1758,6 +1424,7 @@ class Synch:
         for elem in self._synch_table:
             elem.cancel_synch()
         self._synch_table = []
+        self._synch_index = {}
 
 
 class Gatt:
@@ -1832,24 +1499,11 @@ class Gatt:
         self.notification_ev_received.clear()
 
 
-def wait_for_event(timeout, test, args=None):
+def wait_for_event(timeout, test, args=None, event=None):
     if test(args):
         return True
 
-    flag = Event()
-    flag.set()
-
-    t = Timer(timeout, timeout_cb, [flag])
-    t.start()
-
-    while flag.is_set():
-        raise_on_global_end()
-
-        if test(args):
-            t.cancel()
-            return True
-
-    return False
+    return _wait_until(lambda: test(args), timeout, event)
 
 
 def is_procedure_done(list, cnt):
@@ -1867,8 +1521,19 @@ class IAS:
     ALERT_LEVEL_MILD = 1
     ALERT_LEVEL_HIGH = 2
 
+    __slots__ = ('alert_lvl', 'state_changed')
+
     def __init__(self):
         self.alert_lvl = None
+        self.state_changed = Event()
+
+    def cleanup(self):
+        self.alert_lvl = None
+        self.state_changed.clear()
+
+    def wait(self, predicate, timeout=30):
+        """Wait until predicate holds, re-checked on every alert level change"""
+        return wait_for_event(timeout, predicate, event=self.state_changed)
 
     def is_mild_alert_set(self, args):
         return self.alert_lvl == self.ALERT_LEVEL_MILD
@@ -1880,16 +1545,29 @@ class IAS:
         return self.alert_lvl == self.ALERT_LEVEL_NONE
 
     def wait_for_mild_alert(self, timeout=30):
-        return wait_for_event(timeout, self.is_mild_alert_set)
+        return self.wait(self.is_mild_alert_set, timeout)
 
     def wait_for_high_alert(self, timeout=30):
-        return wait_for_event(timeout, self.is_high_alert_set)
+        return self.wait(self.is_high_alert_set, timeout)
 
     def wait_for_stop_alert(self, timeout=30):
-        return wait_for_event(timeout, self.is_alert_stopped)
+        return self.wait(self.is_alert_stopped, timeout)
 
 
 class GattCl:
+    # Discovery kind -> (results list, expected count) attribute names
+    DISCOVERY_RESULTS = {
+        'prim_svcs': ('prim_svcs', 'prim_svcs_cnt'),
+        'incl_svcs': ('incl_svcs', 'incl_svcs_cnt'),
+        'chrcs': ('chrcs', 'chrcs_cnt'),
+        'dscs': ('dscs', 'dscs_cnt'),
+    }
+
+    __slots__ = ('mtu_exchanged', 'verify_values', 'prim_svcs_cnt',
+                 'prim_svcs', 'incl_svcs_cnt', 'incl_svcs', 'chrcs_cnt',
+                 'chrcs', 'dscs_cnt', 'dscs', 'notifications', 'write_status',
+                 'event_to_await', 'prepared_write_hdl', 'state_changed')
+
     def __init__(self):
         # if MTU exchanged tuple (addr, addr_type, status)
         self.mtu_exchanged = Property(None)
@@ -1902,76 +1580,99 @@ class GattCl:
         self.chrcs = []
         self.dscs_cnt = None
         self.dscs = []
-        self.notifications = []
+        self.notifications = deque(maxlen=EVENT_QUEUE_MAXLEN)
         self.write_status = None
         self.event_to_await = None
+        self.prepared_write_hdl = None
+        # Set by the GATTC event handlers whenever the state above changes
+        self.state_changed = Event()
+
+    def wait(self, predicate, timeout=30, args=None):
+        """Wait until predicate(args) holds, re-checked on every GATTC event"""
+        return wait_for_event(timeout, predicate, args, self.state_changed)
 
     def set_event_to_await(self, event):
         self.event_to_await = event
 
     def wait_for_rsp_event(self, timeout=30):
-        return wait_for_event(timeout, self.event_to_await)
+        return self.wait(self.event_to_await, timeout)
 
     def is_mtu_exchanged(self, args):
         return self.mtu_exchanged.data
 
     def wait_for_mtu_exchange(self, timeout=30):
-        return wait_for_event(timeout, self.is_mtu_exchanged)
-
-    def is_prim_disc_complete(self, args):
-        return is_procedure_done(self.prim_svcs, self.prim_svcs_cnt)
-
-    def wait_for_prim_svcs(self, timeout=30):
-        return wait_for_event(timeout, self.is_prim_disc_complete)
-
-    def is_incl_disc_complete(self, args):
-        return is_procedure_done(self.incl_svcs, self.incl_svcs_cnt)
+        return self.wait(self.is_mtu_exchanged, timeout)
 
-    def wait_for_incl_svcs(self, timeout=30):
-        return wait_for_event(timeout, self.is_incl_disc_complete)
+    def is_disc_complete(self, kind):
+        results, count = self.DISCOVERY_RESULTS[kind]
+        return is_procedure_done(getattr(self, results), getattr(self, count))
 
-    def is_chrcs_disc_complete(self, args):
-        return is_procedure_done(self.chrcs, self.chrcs_cnt)
-
-    def wait_for_chrcs(self, timeout=30):
-        return wait_for_event(timeout, self.is_chrcs_disc_complete)
-
-    def is_dscs_disc_complete(self, args):
-        return is_procedure_done(self.dscs, self.dscs_cnt)
-
-    def wait_for_descs(self, timeout=30):
-        return wait_for_event(timeout, self.is_dscs_disc_complete)
+    def wait_for_discovery(self, kind, timeout=30):
+        return self.wait(self.is_disc_complete, timeout, kind)
 
     def is_read_complete(self, args):
-        return self.verify_values != []
+        return bool(self.verify_values)
 
     def wait_for_read(self, timeout=30):
-        return wait_for_event(timeout, self.is_read_complete)
+        return self.wait(self.is_read_complete, timeout)
 
     def is_notification_rxed(self, expected_count):
         if expected_count > 0:
-            return len(self.notifications) == expected_count
+            return len(self.notifications) >= expected_count
         return len(self.notifications) > 0
 
     def wait_for_notifications(self, timeout=30, expected_count=0):
-        return wait_for_event(timeout,
-                              self.is_notification_rxed, expected_count)
+        return self.wait(self.is_notification_rxed, timeout, expected_count)
 
     def is_write_completed(self, args):
         return self.write_status is not None
 
     def wait_for_write_rsp(self, timeout=30):
-        return wait_for_event(timeout, self.is_write_completed)
+        return self.wait(self.is_write_completed, timeout)
+
+
+# Bit of each BTP service in the little endian supported services mask
+_SVC_MASK = {
+    "CORE": 1 << defs.BTP_SERVICE_ID_CORE,
+    "GAP": 1 << defs.BTP_SERVICE_ID_GAP,
+    "GATT": 1 << defs.BTP_SERVICE_ID_GATT,
+    "L2CAP": 1 << defs.BTP_SERVICE_ID_L2CAP,
+    "MESH": 1 << defs.BTP_SERVICE_ID_MESH,
+    "MESH_MMDL": 1 << defs.BTP_SERVICE_ID_MMDL,
+    "GATT_CL": 1 << defs.BTP_SERVICE_ID_GATTC,
+    "VCS": 1 << defs.BTP_SERVICE_ID_VCS,
+    "IAS": 1 << defs.BTP_SERVICE_ID_IAS,
+    "AICS": 1 << defs.BTP_SERVICE_ID_AICS,
+    "VOCS": 1 << defs.BTP_SERVICE_ID_VOCS,
+    "PACS": 1 << defs.BTP_SERVICE_ID_PACS,
+    "ASCS": 1 << defs.BTP_SERVICE_ID_ASCS,
+    "BAP": 1 << defs.BTP_SERVICE_ID_BAP,
+    "MICP": 1 << defs.BTP_SERVICE_ID_MICP,
+    "HAS": 1 << defs.BTP_SERVICE_ID_HAS,
+    "CSIS": 1 << defs.BTP_SERVICE_ID_CSIS,
+    "MICS": 1 << defs.BTP_SERVICE_ID_MICS,
+    "CCP": 1 << defs.BTP_SERVICE_ID_CCP,
+    "VCP": 1 << defs.BTP_SERVICE_ID_VCP,
+    "MCP": 1 << defs.BTP_SERVICE_ID_MCP,
+    "GMCS": 1 << defs.BTP_SERVICE_ID_GMCS,
+}
+# Same bits as flags, so several services can be checked at once, e.g.
+# stack.are_svcs_supported(SVC.GAP | SVC.GATT_CL)
+SVC = IntFlag('SVC', _SVC_MASK)
 
 
 class Stack:
+    __slots__ = ('gap', 'mesh', 'l2cap', 'synch', 'gatt', '_gatt_cl', 'vcs',
+                 'ias', 'vocs', 'aics', 'pacs', 'ascs', 'bap', 'core', 'micp',
+                 'mics', 'ccp', 'vcp', 'mcp', 'gmcs', 'supported_svcs')
+
     def __init__(self):
         self.gap = None
         self.mesh = None
         self.l2cap = None
         self.synch = None
         self.gatt = None
-        self.gatt_cl = None
+        self._gatt_cl = None
         self.vcs = None
         self.ias = None
         self.vocs = None
@@ -1989,33 +1690,16 @@ class Stack:
 
         self.supported_svcs = 0
 
+    @property
+    def gatt_cl(self):
+        # Without a dedicated GATT client the GATT server object serves both
+        return self._gatt_cl or self.gatt
+
     def is_svc_supported(self, svc):
-        # these are in little endian
-        services = {
-            "CORE": 1 << defs.BTP_SERVICE_ID_CORE,
-            "GAP": 1 << defs.BTP_SERVICE_ID_GAP,
-            "GATT": 1 << defs.BTP_SERVICE_ID_GATT,
-            "L2CAP": 1 << defs.BTP_SERVICE_ID_L2CAP,
-            "MESH": 1 << defs.BTP_SERVICE_ID_MESH,
-            "MESH_MMDL": 1 << defs.BTP_SERVICE_ID_MMDL,
-            "GATT_CL": 1 << defs.BTP_SERVICE_ID_GATTC,
-            "VCS": 1 << defs.BTP_SERVICE_ID_VCS,
-            "IAS": 1 << defs.BTP_SERVICE_ID_IAS,
-            "AICS": 1 << defs.BTP_SERVICE_ID_AICS,
-            "VOCS": 1 << defs.BTP_SERVICE_ID_VOCS,
-            "PACS": 1 << defs.BTP_SERVICE_ID_PACS,
-            "ASCS": 1 << defs.BTP_SERVICE_ID_ASCS,
-            "BAP": 1 << defs.BTP_SERVICE_ID_BAP,
-            "MICP": 1 << defs.BTP_SERVICE_ID_MICP,
-            "HAS": 1 << defs.BTP_SERVICE_ID_HAS,
-            "CSIS": 1 << defs.BTP_SERVICE_ID_CSIS,
-            "MICS": 1 << defs.BTP_SERVICE_ID_MICS,
-            "CCP": 1 << defs.BTP_SERVICE_ID_CCP,
-            "VCP": 1 << defs.BTP_SERVICE_ID_VCP,
-            "MCP": 1 << defs.BTP_SERVICE_ID_MCP,
-            "GMCS": 1 << defs.BTP_SERVICE_ID_GMCS,
-        }
-        return self.supported_svcs & services[svc] > 0
+        return self.supported_svcs & _SVC_MASK[svc] != 0
+
+    def are_svcs_supported(self, mask):
+        return self.supported_svcs & mask == mask
 
     def gap_init(self, name=None, manufacturer_data=None, appearance=None,
                  svc_data=None, flags=None, svcs=None, uri=None, periodic_data=None,
@@ -2034,19 +1718,27 @@ class Stack:
 
     def gatt_init(self):
         self.gatt = Gatt()
-        self.gatt_cl = self.gatt
 
     def vcs_init(self):
         self.vcs = VCS()
 
     def aics_init(self):
-        self.aics = AICS()
+        if self.aics:
+            self.aics.cleanup()
+        else:
+            self.aics = AICS()
 
     def vocs_init(self):
-        self.vocs = VOCS()
+        if self.vocs:
+            self.vocs.cleanup()
+        else:
+            self.vocs = VOCS()
 
     def ias_init(self):
-        self.ias = IAS()
+        if self.ias:
+            self.ias.cleanup()
+        else:
+            self.ias = IAS()
 
     def pacs_init(self):
         self.pacs = PACS()
@@ -2070,16 +1762,25 @@ class Stack:
         self.micp = MICP()
 
     def mics_init(self):
-        self.mics = MICS()
+        if self.mics:
+            self.mics.cleanup()
+        else:
+            self.mics = MICS()
 
     def mcp_init(self):
-        self.mcp = MCP()
+        if self.mcp:
+            self.mcp.cleanup()
+        else:
+            self.mcp = MCP()
 
     def gmcs_init(self):
-        self.gmcs = GMCS()
+        if self.gmcs:
+            self.gmcs.cleanup()
+        else:
+            self.gmcs = GMCS()
 
     def gatt_cl_init(self):
-        self.gatt_cl = GattCl()
+        self._gatt_cl = GattCl()
 
     def synch_init(self):
         if not self.synch:
@@ -2088,7 +1789,24 @@ class Stack:
             self.synch.reinit()
 
     def vcp_init(self):
-        self.vcp = VCP()
+        if self.vcp:
+            self.vcp.cleanup()
+        else:
+            self.vcp = VCP()
+
+    def _synch_cancel(self):
+        self.synch.cancel_synch()
+
+    # Cleanup steps, in order, as (attribute, function). A step only runs
+    # if its service has been initialised.
+    _CLEANUP_ORDER = (
+        ('vcs', vcs_init), ('aics', aics_init), ('vocs', vocs_init),
+        ('ias', ias_init), ('pacs', pacs_init), ('ascs', ascs_init),
+        ('bap', bap_init), ('micp', micp_init), ('ccp', ccp_init),
+        ('mics', mics_init), ('gmcs', gmcs_init), ('gatt', gatt_init),
+        ('_gatt_cl', gatt_cl_init), ('synch', _synch_cancel),
+        ('core', core_init), ('vcp', vcp_init), ('mcp', mcp_init),
+    )
 
     def cleanup(self):
         if self.gap:
@@ -2097,56 +1815,9 @@ class Stack:
         if self.mesh:
             self.mesh = Mesh(self.mesh.get_dev_uuid(), self.mesh.get_dev_uuid_lt2())
 
-        if self.vcs:
-            self.vcs_init()
-
-        if self.aics:
-            self.aics_init()
-
-        if self.vocs:
-            self.vocs_init()
-
-        if self.ias:
-            self.ias_init()
-
-        if self.pacs:
-            self.pacs_init()
-
-        if self.ascs:
-            self.ascs_init()
-
-        if self.bap:
-            self.bap_init()
-
-        if self.micp:
-            self.micp_init()
-            
-        if self.ccp:
-            self.ccp_init()
-
-        if self.mics:
-            self.mics_init()
-
-        if self.gmcs:
-            self.gmcs_init()
-
-        if self.gatt:
-            self.gatt_init()
-
-        if self.gatt_cl:
-            self.gatt_cl_init()
-
-        if self.synch:
-            self.synch.cancel_synch()
-
-        if self.core:
-            self.core_init()
-
-        if self.vcp:
-            self.vcp_init()
-
-        if self.mcp:
-            self.mcp_init()
+        for name, step in self._CLEANUP_ORDER:
+            if getattr(self, name):
+                step(self)
 
 
 def init_stack():
@@ -179,6 +179,7 @@ def gap_connected_ev_(gap, data, data_len):
     else:
         gap.connected.data.append((addr, addr_type))
     gap.set_conn_params(ConnParams(itvl, itvl, latency, timeout))
+    gap.state_changed.set()
 
 
 def gap_disconnected_ev_(gap, data, data_len):
@@ -186,6 +187,7 @@ def gap_disconnected_ev_(gap, data, data_len):
 
     gap.sec_level = 0
     gap.connected.data = None
+    gap.state_changed.set()
 
 
 def gap_passkey_disp_ev_(gap, data, data_len):
@@ -203,6 +205,7 @@ def gap_passkey_disp_ev_(gap, data, data_len):
     logging.debug("passkey = %r", passkey)
 
     gap.passkey.data = passkey
+    gap.state_changed.set()
 
 
 def gap_identity_resolved_ev_(gap, data, data_len):
@@ -260,6 +263,7 @@ def gap_sec_level_changed_ev_(gap, data, data_len):
     _addr = binascii.hexlify(_addr[::-1]).decode()
 
     gap.sec_level = _level
+    gap.state_changed.set()
 
     logging.debug("received %r", (_addr_t, _addr, _level))
 
@@ -295,6 +299,7 @@ def gap_pairing_failed_ev_(gap, data, data_len):
     logging.debug("received %r", (_addr_t, _addr, _reason))
 
     stack.gap.pairing_failed_rcvd.data = (_addr_t, _addr, _reason)
+    stack.gap.state_changed.set()
 
 
 def gap_bond_lost_ev_(gap, data, data_len):
@@ -311,6 +316,7 @@ def gap_bond_lost_ev_(gap, data, data_len):
 
     logging.debug("received %r", (_addr_t, _addr))
     gap.bond_lost_ev_data.data = (_addr_t, _addr)
+    gap.state_changed.set()
 
 
 def gap_padv_sync_established_ev_(gap, data, data_len):
@@ -318,6 +324,7 @@ def gap_padv_sync_established_ev_(gap, data, data_len):
     stack = get_stack()
 
     stack.gap.periodic_sync_established_rxed = True
+    stack.gap.state_changed.set()
 
 
 def gap_padv_sync_lost_ev_(gap, data, data_len):
@@ -331,12 +338,14 @@ def gap_padv_report_ev_(gap, data, data_len):
     logging.debug("%s", gap_padv_report_ev_.__name__)
     stack = get_stack()
     stack.gap.periodic_report_rxed = True
+    stack.gap.state_changed.set()
 
 
 def gap_padv_transfer_received_ev_(gap, data, data_len):
     logging.debug("%s", gap_padv_transfer_received_ev_.__name__)
     stack = get_stack()
     stack.gap.periodic_transfer_received = True
+    stack.gap.state_changed.set()
 
 
 def gap_passkey_confirm_req_ev_(gap, data, data_len):
@@ -355,6 +364,7 @@ def gap_passkey_confirm_req_ev_(gap, data, data_len):
     logging.debug("passkey = %r", passkey)
 
     gap.passkey.data = passkey
+    gap.state_changed.set()
 
 
 def gap_passkey_entry_req_ev_(gap, data, data_len):
@@ -368,6 +378,7 @@ def gap_passkey_entry_req_ev_(gap, data, data_len):
     _addr = binascii.hexlify(_addr[::-1]).lower().decode('utf-8')
 
     gap.passkey.data = randint(0, 999999)
+    gap.state_changed.set()
 
 
 GAP_EV = {
@@ -1249,7 +1260,8 @@ def check_discov_results(addr_type=None, addr=None, discovered=True, eir=None, u
     found = False
 
     stack = get_stack()
-    devices = stack.gap.found_devices.data
+    # The BTP thread keeps appending while the scan runs
+    devices = list(stack.gap.found_devices.data)
 
     for device in devices:
         logging.debug("matching %r", device)
@@ -1291,7 +1303,8 @@ def check_discov_results(addr_type=None, addr=None, discovered=True, eir=None, u
 
 def check_scan_rep_and_rsp(report, response):
     stack = get_stack()
-    devices = stack.gap.found_devices.data
+    # The BTP thread keeps appending while the scan runs
+    devices = list(stack.gap.found_devices.data)
 
     # remove trailing zeros
     report = report.rstrip('0').upper()
@@ -15,6 +15,7 @@
 #
 
 import binascii
+import functools
 import logging
 import struct
 
@@ -24,7 +25,7 @@ from autopts.pybtp.btp.btp import btp_hdr_check, CONTROLLER_INDEX, \
     get_iut_method as get_iut, btp2uuid, clear_verify_values, \
     add_to_verify_values, get_verify_values, extend_verify_values
 from autopts.pybtp.btp.gap import gap_wait_for_connection
-from autopts.ptsprojects.stack import get_stack, GattCharacteristic
+from autopts.ptsprojects.stack import get_stack, GattCharacteristic, GattCl
 
 GATTC = {
     "read_supp_cmds": (defs.BTP_SERVICE_ID_GATTC,
@@ -70,6 +71,20 @@ GATTC = {
 }
 
 
+def gatt_cl_state_changed(handler):
+    """Wake up GattCl waiters once the event handler has run"""
+    @functools.wraps(handler)
+    def wrapper(gatt_cl, data, data_len):
+        handler(gatt_cl, data, data_len)
+
+        # Plain GATT setups alias gatt_cl to a Gatt object
+        if isinstance(gatt_cl, GattCl):
+            gatt_cl.state_changed.set()
+
+    return wrapper
+
+
+@gatt_cl_state_changed
 def gatt_cl_mtu_exchanged_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_mtu_exchanged_ev_.__name__, data)
 
@@ -206,6 +221,7 @@ att_rsp_str = {0: "",
                }
 
 
+@gatt_cl_state_changed
 def gatt_cl_disc_all_prim_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_disc_all_prim_rsp_ev_.__name__, data)
 
@@ -240,6 +256,7 @@ def gatt_cl_disc_all_prim_rsp_ev_(gatt_cl, data, data_len):
             gatt_cl.prim_svcs.append((start_handle, end_handle, uuid))
 
 
+@gatt_cl_state_changed
 def gatt_cl_disc_prim_uuid_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_disc_prim_uuid_rsp_ev_.__name__, data)
 
@@ -280,6 +297,7 @@ def gatt_cl_disc_prim_uuid_rsp_ev_(gatt_cl, data, data_len):
         gatt_cl.prim_svcs.append((start_handle, end_handle, uuid))
 
 
+@gatt_cl_state_changed
 def gatt_cl_find_incld_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_find_incld_rsp_ev_.__name__, data)
 
@@ -316,6 +334,7 @@ def gatt_cl_find_incld_rsp_ev_(gatt_cl, data, data_len):
                                 uuid))
 
 
+@gatt_cl_state_changed
 def gatt_cl_disc_all_chrc_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_disc_all_chrc_rsp_ev_.__name__, data)
     attrs = []
@@ -354,6 +373,7 @@ def gatt_cl_disc_all_chrc_rsp_ev_(gatt_cl, data, data_len):
         gatt_cl.chrcs.append((attr.value_handle, attr.uuid))
 
 
+@gatt_cl_state_changed
 def gatt_cl_disc_chrc_uuid_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_disc_chrc_uuid_rsp_ev_.__name__, data)
     attrs = []
@@ -392,6 +412,7 @@ def gatt_cl_disc_chrc_uuid_rsp_ev_(gatt_cl, data, data_len):
         gatt_cl.chrcs.append((attr.value_handle, attr.uuid))
 
 
+@gatt_cl_state_changed
 def gatt_cl_disc_all_desc_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_disc_all_desc_rsp_ev_.__name__, data)
 
@@ -425,6 +446,7 @@ def gatt_cl_disc_all_desc_rsp_ev_(gatt_cl, data, data_len):
         gatt_cl.dscs.append((handle, uuid))
 
 
+@gatt_cl_state_changed
 def gatt_cl_read_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_read_rsp_ev_.__name__, data)
 
@@ -455,6 +477,7 @@ def gatt_cl_read_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("Set verify values to: %r", get_verify_values())
 
 
+@gatt_cl_state_changed
 def gatt_cl_read_uuid_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_read_uuid_rsp_ev_.__name__, data)
 
@@ -507,6 +530,7 @@ def gatt_cl_read_uuid_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("Set verify values to: %r", get_verify_values())
 
 
+@gatt_cl_state_changed
 def gatt_cl_read_long_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_read_long_rsp_ev_.__name__, data)
 
@@ -533,6 +557,7 @@ def gatt_cl_read_long_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("Set verify values to: %r", get_verify_values())
 
 
+@gatt_cl_state_changed
 def gatt_cl_read_mult_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_read_mult_rsp_ev_.__name__, data)
 
@@ -569,6 +594,7 @@ def gatt_cl_read_mult_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("Set verify values to: %r", get_verify_values())
 
 
+@gatt_cl_state_changed
 def gatt_cl_read_mult_var_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_read_mult_var_rsp_ev_.__name__, data)
 
@@ -603,6 +629,7 @@ def gatt_cl_read_mult_var_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("Set verify values to: %r", get_verify_values())
 
 
+@gatt_cl_state_changed
 def gatt_cl_write_rsp_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_write_rsp_ev_.__name__, data)
 
@@ -616,6 +643,7 @@ def gatt_cl_write_rsp_ev_(gatt_cl, data, data_len):
     gatt_cl.write_status = status
 
 
+@gatt_cl_state_changed
 def gatt_cl_notification_rxed_ev_(gatt_cl, data, data_len):
     logging.debug("%s %r", gatt_cl_notification_rxed_ev_.__name__, data)
 
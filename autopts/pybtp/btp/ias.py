@@ -26,6 +26,7 @@ def ias_ev_out_alert_action(ias, data, data_len):
     alert_lvl = int.from_bytes(data, "little")
 
     stack.ias.alert_lvl = alert_lvl
+    stack.ias.state_changed.set()
 
 IAS_EV = {
     defs.IAS_EV_OUT_ALERT_ACTION: ias_ev_out_alert_action,
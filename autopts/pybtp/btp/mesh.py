@@ -858,6 +858,7 @@ def mesh_prov_link_open_ev(mesh, data, data_len):
     (bearer,) = struct.unpack('<B', data)
 
     mesh.last_seen_prov_link_state.data = ('open', bearer)
+    mesh.state_changed.set()
 
 
 def mesh_prov_link_closed_ev(mesh, data, data_len):
@@ -867,6 +868,7 @@ def mesh_prov_link_closed_ev(mesh, data, data_len):
     (bearer,) = struct.unpack('<B', data)
 
     mesh.last_seen_prov_link_state.data = ('closed', bearer)
+    mesh.state_changed.set()
 
     stack.mesh.provisioning_in_progress.data = False
 
@@ -924,6 +926,7 @@ def mesh_incomp_timer_exp_ev(mesh, data, data_len):
     stack = get_stack()
 
     stack.mesh.incomp_timer_exp.data = True
+    stack.mesh.state_changed.set()
 
 
 def mesh_frnd_established_ev(mesh, data, data_len):
@@ -962,6 +965,7 @@ def mesh_lpn_established_ev(mesh, data, data_len):
         struct.unpack_from(hdr_fmt, data, 0)
 
     stack.mesh.lpn.data = True
+    stack.mesh.state_changed.set()
 
 
 def mesh_lpn_terminated_ev(mesh, data, data_len):
@@ -974,6 +978,7 @@ def mesh_lpn_terminated_ev(mesh, data, data_len):
     (net_idx, frnd_addr) = struct.unpack_from(hdr_fmt, data, 0)
 
     stack.mesh.lpn.data = False
+    stack.mesh.state_changed.set()
 
 
 def mesh_cfg_beacon_get(net_idx, addr):
@@ -2056,6 +2061,7 @@ def mesh_model_recv_ev(mesh, data, data_len):
         stack.mesh.blob_rxed_bytes += (len(payload)-6)//2
 
     stack.mesh.model_recv_ev_data.data = (src, dst, payload)
+    stack.mesh.state_changed.set()
 
 def mesh_blob_lost_target_ev(mesh, data, data_len):
     logging.debug("%s %r %r", mesh_blob_lost_target_ev.__name__, data, data_len)
@@ -2066,6 +2072,7 @@ def mesh_blob_lost_target_ev(mesh, data, data_len):
         return
 
     stack.mesh.blob_lost_target = True
+    stack.mesh.state_changed.set()
 
 MESH_EV = {
     defs.MESH_EV_OUT_NUMBER_ACTION: mesh_out_number_action_ev,
@@ -1901,7 +1901,7 @@ def hdl_wid_364(_: WIDParams):
     addr_type = pts_addr_type_get()
     stack = get_stack()
 
-    for ev in stack.bap.event_queues[defs.BAP_EV_ASE_FOUND]:
+    for ev in stack.bap.event_queues[defs.BAP_EV_ASE_FOUND].snapshot():
         _, _, ase_dir, ase_id = ev
 
         if ase_dir == AudioDir.SOURCE:
@@ -1920,7 +1920,7 @@ def hdl_wid_366(_: WIDParams):
     addr_type = pts_addr_type_get()
     stack = get_stack()
 
-    for ev in stack.bap.event_queues[defs.BAP_EV_ASE_FOUND]:
+    for ev in stack.bap.event_queues[defs.BAP_EV_ASE_FOUND].snapshot():
         _, _, ase_dir, ase_id = ev
 
         if ase_dir == AudioDir.SINK:
@@ -1959,12 +1959,12 @@ def hdl_wid_376(params: WIDParams):
         return True
 
     if params.test_case_name.startswith('BAP/BSNK'):
-        for ev in stack.bap.event_queues[defs.BAP_EV_BIS_SYNCED]:
+        for ev in stack.bap.event_queues[defs.BAP_EV_BIS_SYNCED].snapshot():
             ev = stack.bap.wait_bis_stream_received_ev(ev['broadcast_id'], ev['bis_id'], 10)
             if ev is None:
                 return False
     else:
-        for ev in stack.bap.event_queues[defs.BAP_EV_ASE_FOUND]:
+        for ev in stack.bap.event_queues[defs.BAP_EV_ASE_FOUND].snapshot():
             _, _, ase_dir, ase_id = ev
 
             if ase_dir == AudioDir.SINK:
@@ -1982,7 +1982,7 @@ def hdl_wid_377(_: WIDParams):
     stack = get_stack()
 
     sources = []
-    for ev in stack.ascs.event_queues[defs.ASCS_EV_ASE_STATE_CHANGED]:
+    for ev in stack.ascs.event_queues[defs.ASCS_EV_ASE_STATE_CHANGED].snapshot():
         _, _, ase_id, state = ev
 
         if state == ASCSState.STREAMING:
@@ -2098,7 +2098,7 @@ def hdl_wid_387(_: WIDParams):
     stack = get_stack()
 
     sources = []
-    for ev in stack.ascs.event_queues[defs.ASCS_EV_ASE_STATE_CHANGED]:
+    for ev in stack.ascs.event_queues[defs.ASCS_EV_ASE_STATE_CHANGED].snapshot():
         _, _, ase_id, state = ev
 
         if state == ASCSState.STREAMING:
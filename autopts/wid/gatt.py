@@ -1117,10 +1117,10 @@ def hdl_wid_93(params: WIDParams):
     else:
         addr_type, addr = (btp.pts_addr_type_get(), btp.pts_addr_get())
 
-    db = gatt_server_fetch_db().db
-    for i in range(1, len(db) + 1):
-        if isinstance(db[i], GattCharacteristic) and db[i].prop & Prop.notify:
-            handles.append(db[i].handle + 1)
+    db = gatt_server_fetch_db()
+    for attr in db.attr_lookup_range(0x0001, 0xffff):
+        if isinstance(attr, GattCharacteristic) and attr.prop & Prop.notify:
+            handles.append(attr.handle + 1)
 
     btp.gatts_notify_mult(addr_type, addr, len(handles), handles)
     return True
@@ -2019,10 +2019,10 @@ def hdl_wid_308(params: WIDParams):
     else:
         addr_type, addr = (btp.pts_addr_type_get(), btp.pts_addr_get())
 
-    db = gatt_server_fetch_db().db
-    for i in range(1, len(db) + 1):
-        if isinstance(db[i], GattCharacteristic) and db[i].prop & Prop.notify:
-            handles.append(db[i].handle + 1)
+    db = gatt_server_fetch_db()
+    for attr in db.attr_lookup_range(0x0001, 0xffff):
+        if isinstance(attr, GattCharacteristic) and attr.prop & Prop.notify:
+            handles.append(attr.handle + 1)
 
     # IUT may fail here (or silently ignore and return success)
     try:
@@ -111,7 +111,7 @@ def hdl_wid_11(_: WIDParams):
     Discover primary service by UUID in small database.
     """
     stack = get_stack()
-    stack.gatt_cl.wait_for_prim_svcs()
+    stack.gatt_cl.wait_for_discovery('prim_svcs')
     return stack.gatt_cl.prim_svcs == []
 
 
@@ -164,7 +164,7 @@ def hdl_wid_17(params: WIDParams):
     """
 
     stack = get_stack()
-    stack.gatt_cl.wait_for_prim_svcs()
+    stack.gatt_cl.wait_for_discovery('prim_svcs')
 
     handle_list = re.findall(r"\'(.*?)\'", params.description)
     for h in handle_list:
@@ -209,7 +209,7 @@ def hdl_wid_19(params: WIDParams):
     Discover primary service by UUID in database."
     """
     stack = get_stack()
-    stack.gatt_cl.wait_for_prim_svcs()
+    stack.gatt_cl.wait_for_discovery('prim_svcs')
 
     desc_params = re.findall(r"\'(.*?)\'", params.description)
     return (desc_params[1], desc_params[2], desc_params[0]) in stack.gatt_cl.prim_svcs
@@ -252,7 +252,7 @@ def hdl_wid_21(params: WIDParams):
     Discover primary service by UUID in database.
     """
     stack = get_stack()
-    stack.gatt_cl.wait_for_prim_svcs()
+    stack.gatt_cl.wait_for_discovery('prim_svcs')
 
     desc_params = re.findall(r"\'(.*?)\'", params.description)
     return (desc_params[1], desc_params[2], desc_params[0]) in stack.gatt_cl.prim_svcs
@@ -348,7 +348,7 @@ def hdl_wid_28(params: WIDParams):
     MMI.parse_description(params.description)
 
     stack = get_stack()
-    stack.gatt_cl.wait_for_chrcs()
+    stack.gatt_cl.wait_for_discovery('chrcs')
 
     for hdl in MMI.args:
         hdl = int(hdl, 16)
@@ -396,7 +396,7 @@ def hdl_wid_30(params: WIDParams):
 
     stack = get_stack()
     sleep(1)
-    stack.gatt_cl.wait_for_chrcs()
+    stack.gatt_cl.wait_for_discovery('chrcs')
 
     if int(MMI.args[0], 16) == stack.gatt_cl.chrcs[0][0] and \
             MMI.args[1].replace('-', '') == stack.gatt_cl.chrcs[0][1]:
@@ -441,7 +441,7 @@ def hdl_wid_32(params: WIDParams):
     MMI.parse_description(params.description)
 
     stack = get_stack()
-    stack.gatt_cl.wait_for_descs()
+    stack.gatt_cl.wait_for_discovery('dscs')
 
     val = re.search(r"0x[A-F0-9]+", params.description).group(0)[2:]
 
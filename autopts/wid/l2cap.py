@@ -318,7 +318,7 @@ def hdl_wid_61(_: WIDParams):
 
 def hdl_wid_100(_: WIDParams):
     l2cap = get_stack().l2cap
-    for channel in l2cap.channels:
+    for channel in list(l2cap.channels.values()):
         try:
             while True:
                 btp.l2cap_send_data(channel.id, '00')
@@ -331,7 +331,7 @@ def hdl_wid_100(_: WIDParams):
 
 def hdl_wid_101(_: WIDParams):
     l2cap = get_stack().l2cap
-    for channel in l2cap.channels:
+    for channel in list(l2cap.channels.values()):
         try:
             btp.l2cap_disconn(channel.id)
         except BTPError:
@@ -350,7 +350,7 @@ def hdl_wid_103(_: WIDParams):
     chan = stack.l2cap.chan_lookup_id(0)
     time.sleep(10)
     btp.l2cap_reconfigure(None, None, chan.our_mtu + 1,
-                          [chan.id for chan in stack.l2cap.channels])
+                          list(stack.l2cap.channels))
     return True
 
 
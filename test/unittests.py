@@ -1,6 +1,8 @@
 import os
 import shutil
 import sys
+import threading
+import time
 import unittest
 from os.path import dirname, abspath
 from pathlib import Path
@@ -11,7 +13,10 @@ from autopts.client import FakeProxy, TestCaseRunStats
 from autopts.ptsprojects.testcase_db import TestCaseTable
 from autoptsclient_bot import import_bot_projects, import_bot_module
 from test.mocks.mocked_test_cases import mock_workspace_test_cases, test_case_list_generation_samples
+from autopts import utils
 from autopts.bot.common_features import report
+from autopts.ptsprojects import stack
+from autopts.pybtp import defs
 
 
 DATABASE_FILE = 'test/mocks/zephyr_database.db'
@@ -296,5 +301,322 @@ class MyTestCase(unittest.TestCase):
                 delete_file(files[key])
 
 
+def run_later(delay, func, *args):
+    timer = threading.Timer(delay, func, args)
+    timer.start()
+    return timer
+
+
+class StackTestCase(unittest.TestCase):
+    def set_global_end_later(self, delay):
+        self.addCleanup(setattr, utils, 'GLOBAL_END', False)
+        return run_later(delay, utils.set_global_end)
+
+    def test_wait_until_polling(self):
+        """Check that _wait_until() polls the predicate until its deadline"""
+        state = []
+        run_later(0.1, state.append, True)
+        assert stack._wait_until(lambda: state, 5)
+
+        start = time.monotonic()
+        assert not stack._wait_until(lambda: False, 0.3)
+        assert 0.3 <= time.monotonic() - start < 1
+
+        gap = stack.Gap('name', None, None, None, None, None, None)
+        assert not gap.wait_for_connection(timeout=0.2)
+
+    def test_wait_until_global_end(self):
+        """Check that a global end aborts a polling _wait_until()"""
+        self.set_global_end_later(0.1)
+        start = time.monotonic()
+        with self.assertRaises(utils.RunEnd):
+            stack._wait_until(lambda: False, 10)
+        assert time.monotonic() - start < 1
+
+    @patch.object(stack, 'WAIT_POLL_INTERVAL', 5)
+    def test_wait_until_event_wakeup(self):
+        """Check that Gap waits wake up as soon as state_changed is set"""
+        gap = stack.Gap('name', None, None, None, None, None, None)
+
+        def connected():
+            gap.connected.data = ('001122334455', 0)
+            gap.state_changed.set()
+
+        run_later(0.1, connected)
+        start = time.monotonic()
+        assert gap.wait_for_connection(timeout=10)
+        assert time.monotonic() - start < 2
+
+        run_later(0.1, gap.set_passkey, 123456)
+        start = time.monotonic()
+        assert gap.get_passkey(timeout=10) == 123456
+        assert time.monotonic() - start < 2
+
+        start = time.monotonic()
+        assert not gap.wait_for_disconnection(timeout=0.3)
+        assert time.monotonic() - start < 2
+
+    def test_wait_until_event_global_end(self):
+        """Check that a global end aborts a wait blocked on its event"""
+        gap = stack.Gap('name', None, None, None, None, None, None)
+        self.set_global_end_later(0.1)
+        with self.assertRaises(utils.RunEnd):
+            gap.wait_for_connection(timeout=10)
+
+    @patch.object(stack, 'WAIT_POLL_INTERVAL', 5)
+    def test_wait_for_event(self):
+        """Check wait_for_event() fast path, wake-up, args and timeout"""
+        event = threading.Event()
+        values = []
+
+        def has_value(value):
+            return value in values
+
+        assert stack.wait_for_event(0, lambda args: True)
+
+        def add_value():
+            values.append(1)
+            event.set()
+
+        run_later(0.1, add_value)
+        start = time.monotonic()
+        assert stack.wait_for_event(10, has_value, 1, event)
+        assert time.monotonic() - start < 2
+
+        start = time.monotonic()
+        assert not stack.wait_for_event(0.3, has_value, 2, event)
+        assert 0.3 <= time.monotonic() - start < 2
+
+        assert not stack.wait_for_event(0.2, has_value, 2)
+
+    def test_wait_for_event_global_end(self):
+        """Check that a global end aborts wait_for_event()"""
+        self.set_global_end_later(0.1)
+        with self.assertRaises(utils.RunEnd):
+            stack.wait_for_event(10, lambda args: False, event=threading.Event())
+
+    def test_synch_turn_order(self):
+        """Check that synch points run in order across two LT threads"""
+        synch = stack.Synch()
+        points = [stack.SynchPoint('TC/LT1', 10), stack.SynchPoint('TC/LT2', 20)]
+        synch.add_synch_element(points)
+        order = []
+
+        def run_wid(tc_name, wid):
+            elem = synch.wait_for_start(wid, tc_name)
+            if elem is None:
+                order.append(None)
+                return
+
+            order.append(tc_name)
+            time.sleep(0.1)
+            synch.wait_for_end(elem)
+
+        # The second point starts first, but must wait for its turn
+        threads = [threading.Thread(target=run_wid, args=('TC/LT2', 20)),
+                   threading.Thread(target=run_wid, args=('TC/LT1', 10))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join(5)
+
+        assert order == ['TC/LT1', 'TC/LT2']
+        # The element is dropped once both points passed the end barrier
+        assert synch.wait_for_start(10, 'TC/LT1') is None
+
+    def test_synch_elem_turn_reset(self):
+        """Check that passing the end barrier resets the turn"""
+        points = [stack.SynchPoint('TC/LT1', 10), stack.SynchPoint('TC/LT2', 20)]
+        elem = stack.SynchElem(points)
+
+        assert elem.wait_for_your_turn(points[0])
+        elem.set_done(points[0])
+        assert elem.wait_for_your_turn(points[1])
+        elem.set_done(points[1])
+
+        threads = [threading.Thread(target=elem.wait_for_end) for _ in points]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        # Do not hang if the turn was left at the end of the list
+        timer = run_later(2, elem.cancel_synch)
+        assert elem.wait_for_your_turn(points[0])
+        timer.cancel()
+
+    def test_synch_elem_cancel(self):
+        """Check that cancel_synch() releases a thread waiting for its turn"""
+        points = [stack.SynchPoint('TC/LT1', 10), stack.SynchPoint('TC/LT2', 20)]
+        elem = stack.SynchElem(points)
+
+        run_later(0.1, elem.cancel_synch)
+        start = time.monotonic()
+        assert not elem.wait_for_your_turn(points[1])
+        assert time.monotonic() - start < 2
+
+        assert not elem.wait_for_your_turn(stack.SynchPoint('TC/LT3', 30))
+
+    def test_stack_cleanup(self):
+        """Check that cleanup re-inits only the services in use"""
+        stack_inst = stack.Stack()
+        stack_inst.gap_init('name')
+        stack_inst.gatt_init()
+        stack_inst.vcs_init()
+        stack_inst.bap_init()
+        stack_inst.core_init()
+        stack_inst.core.event_received(defs.CORE_EV_IUT_READY, True)
+
+        gap, gatt, vcs, bap, core = (stack_inst.gap, stack_inst.gatt,
+                                     stack_inst.vcs, stack_inst.bap,
+                                     stack_inst.core)
+        stack_inst.gap.connected.data = ('001122334455', 0)
+        stack_inst.cleanup()
+
+        assert stack_inst.gap is not gap
+        assert stack_inst.gap.name == 'name'
+        assert stack_inst.gap.connected.data is None
+        assert stack_inst.gatt is not gatt
+        assert stack_inst.gatt_cl is stack_inst.gatt
+        assert stack_inst.vcs is not vcs
+        assert stack_inst.bap is not bap
+        # CORE is reset in place and keeps the IUT ready event
+        assert stack_inst.core is core
+        assert core.event_queues[defs.CORE_EV_IUT_READY]
+
+        for name in ('mesh', 'l2cap', 'synch', 'aics', 'vocs', 'ias', 'pacs',
+                     'ascs', 'micp', 'mics', 'ccp', 'vcp', 'mcp', 'gmcs'):
+            assert getattr(stack_inst, name) is None, name
+
+    def test_stack_cleanup_gatt_cl(self):
+        """Check that cleanup keeps a dedicated GATT client separate"""
+        stack_inst = stack.Stack()
+        stack_inst.gatt_init()
+        stack_inst.gatt_cl_init()
+        gatt_cl = stack_inst.gatt_cl
+        stack_inst.cleanup()
+
+        assert isinstance(stack_inst.gatt_cl, stack.GattCl)
+        assert stack_inst.gatt_cl is not gatt_cl
+        assert stack_inst.gatt_cl is not stack_inst.gatt
+
+    def test_stack_cleanup_order_table(self):
+        """Check every _CLEANUP_ORDER entry cleans up only its own service"""
+        names = [name for name, _ in stack.Stack._CLEANUP_ORDER]
+
+        for name in names:
+            stack_inst = stack.Stack()
+            getattr(stack_inst, name.lstrip('_') + '_init')()
+            assert getattr(stack_inst, name) is not None, name
+
+            stack_inst.cleanup()
+
+            assert getattr(stack_inst, name) is not None, name
+            for other in names:
+                if other != name:
+                    assert getattr(stack_inst, other) is None, (name, other)
+
+    def test_stack_cleanup_cancels_synch_in_order(self):
+        """Check that synch waiters are cancelled before CORE is reset"""
+        stack_inst = stack.Stack()
+        stack_inst.gatt_init()
+        stack_inst.synch_init()
+        stack_inst.core_init()
+        stack_inst.mcp_init()
+        calls = []
+
+        with patch.object(stack.Synch, 'cancel_synch',
+                          lambda self: calls.append('synch')), \
+                patch.object(stack.CORE, 'cleanup',
+                             lambda self: calls.append('core')), \
+                patch.object(stack.MCP, 'cleanup',
+                             lambda self: calls.append('mcp')):
+            stack_inst.cleanup()
+
+        assert calls == ['synch', 'core', 'mcp']
+
+    def test_l2cap_disconnect_during_rx_data_get_all(self):
+        """Check that a channel can disconnect while waiting for its data"""
+        l2cap = stack.L2cap(0x0080, 64)
+        for chan_id in (0, 1):
+            l2cap.connected(chan_id, 0x0080, 64, 64, 64, 64, 0, '001122334455')
+
+        run_later(0.2, l2cap.disconnected, 1, 0x0080, 0, '001122334455', 0)
+
+        assert l2cap.rx_data_get_all(0.5) == [None, None]
+        assert list(l2cap.channels) == [0]
+        assert l2cap.tx_data_get_all() == [[]]
+
+    def test_ias_wait_for_alert(self):
+        """Check that IAS waits wake up on an alert level change"""
+        ias = stack.IAS()
+
+        def set_alert_lvl(alert_lvl):
+            ias.alert_lvl = alert_lvl
+            ias.state_changed.set()
+
+        run_later(0.1, set_alert_lvl, stack.IAS.ALERT_LEVEL_HIGH)
+        start = time.monotonic()
+        assert ias.wait_for_high_alert(timeout=5)
+        assert time.monotonic() - start < 1
+
+        assert not ias.wait_for_mild_alert(timeout=0.2)
+
+        run_later(0.1, set_alert_lvl, stack.IAS.ALERT_LEVEL_NONE)
+        assert ias.wait_for_stop_alert(timeout=5)
+
+    def test_event_queue_snapshot(self):
+        """Check that a queue snapshot can be iterated while events arrive"""
+        queue = stack.EventQueue()
+        queue.extend([1, 2])
+
+        for ev in queue.snapshot():
+            queue.append(ev + 2)
+
+        assert list(queue) == [1, 2, 3, 4]
+
+    def test_gap_found_devices_not_evicted(self):
+        """Check that a long scan keeps every found device report"""
+        gap = stack.Gap('name', None, None, None, None, None, None)
+        gap.reset_discovery()
+
+        for i in range(2000):
+            gap.found_devices.data.append(i)
+
+        assert gap.found_devices.data[0] == 0
+        assert len(gap.found_devices.data) == 2000
+
+    def test_addr_event_waiter(self):
+        """Check that generated waiters only take events for the address"""
+        vcp = stack.VCP()
+        vcp.event_received(defs.VCP_STATE_EV, (0, 'aabbcc', 1))
+        vcp.event_received(defs.VCP_STATE_EV, (1, 'ddeeff', 2))
+
+        assert vcp.wait_vcp_state_ev(1, 'ddeeff', 1) == (1, 'ddeeff', 2)
+        assert vcp.wait_vcp_state_ev(1, 'ddeeff', 0.1) is None
+        assert vcp.wait_vcp_state_ev(0, 'aabbcc', 1, remove=False) == (0, 'aabbcc', 1)
+        assert len(vcp.event_queues[defs.VCP_STATE_EV]) == 1
+
+    def test_gatt_db_lookup(self):
+        """Check GATT database handle and range lookups"""
+        db = stack.GattDB()
+        for handle in [5, 1, 3, 0xffff, 2]:
+            db.attr_add(handle, 'attr%d' % handle)
+        db.attr_add(3, 'attr3 updated')
+
+        assert list(db.handles) == [1, 2, 3, 5, 0xffff]
+        assert db.attr_lookup_handle(5) == 'attr5'
+        assert db.attr_lookup_handle(3) == 'attr3 updated'
+        assert db.attr_lookup_handle(4) is None
+
+        assert db.attr_lookup_range(2, 5) == ['attr2', 'attr3 updated', 'attr5']
+        assert db.attr_lookup_range(4, 4) == []
+        assert db.attr_lookup_range(6, 0xfffe) == []
+        assert db.attr_lookup_range(5, 2) == []
+        assert db.attr_lookup_range(0x0001, 0xffff)[-1] == 'attr65535'
+        assert stack.GattDB().attr_lookup_range(0x0001, 0xffff) == []
+
+
 if __name__ == '__main__':
     unittest.main()